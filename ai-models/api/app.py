@@ -3,12 +3,34 @@ MediAI - Drug Interaction & Side Effects API
 Simplified Flask API using prepared datasets with FUZZY MATCHING
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import pandas as pd
+import io
 import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from difflib import SequenceMatcher, get_close_matches
+from difflib import SequenceMatcher
+from fuzzy_index import SymSpell, TermMatcher, TrigramIndex
+from condition_matcher import ConditionMatcher
+from diagnosis_engine import DiagnosisModel, rank_conditions
+from interaction_store import InteractionStore
+from bulk_screening import detect_format, read_regimens, screen_regimens, to_ndjson
+from query_cache import LRUCache, normalize_search_query
+from dataset_snapshot import load_snapshot, save_snapshot, snapshot_path
+from flat_arrays import FlatInteractionStore, FlatSearchIndex, FlatTrigramIndex
+
+# Try to import the TF-IDF engine (needs scikit-learn) for batched fuzzy matching
+try:
+    from tfidf_search import TfidfNameSearch
+    SKLEARN_AVAILABLE = True
+except ImportError:
+    SKLEARN_AVAILABLE = False
+    print("⚠️  scikit-learn not installed. Batch fuzzy matching falls back to the trigram index.")
 
 app = Flask(__name__)
 CORS(app)
@@ -16,69 +38,211 @@ CORS(app)
 # Setup paths
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / 'data' / 'processed'
+CONDITIONS_FILE = BASE_DIR / 'knowledge_base' / 'conditions.json'
+DIAGNOSIS_MODEL_FILE = DATA_DIR / 'diagnosis_model.npz'
 
-# Load data
-print("📂 Loading datasets...")
-medicines_df = pd.read_csv(DATA_DIR / 'indian_medicines_filtered_5k.csv')
-interactions_df = pd.read_csv(DATA_DIR / 'drug_interactions.csv')
-side_effects_df = pd.read_csv(DATA_DIR / 'drug_side_effects.csv')
+# Raw dataset files (a startup snapshot is only used while these are unchanged)
+SOURCE_FILES = [
+    DATA_DIR / 'indian_medicines_filtered_5k.csv',
+    DATA_DIR / 'drug_interactions.csv',
+    DATA_DIR / 'drug_side_effects.csv',
+    DATA_DIR / 'medicine_search_index.json',
+    DATA_DIR / 'symptom_search_index.json',
+    CONDITIONS_FILE,
+    DIAGNOSIS_MODEL_FILE
+]
+SNAPSHOT_PATH = snapshot_path('app')
+
+# Module globals restored from / saved to the snapshot
+DATASET_NAMES = (
+    'medicines_df', 'interactions_df', 'side_effects_df', 'search_index',
+    'medicine_suggester', 'medicine_fuzzy_index', 'medicine_tfidf', 'interaction_store',
+    'symptom_search_index', 'symptom_database', 'symptom_suggester', 'symptom_matcher',
+    'condition_matcher', 'diagnosis_model'
+)
+
+def build_datasets():
+    """Parse the raw dataset files and build every derived index"""
+    medicines_df = pd.read_csv(DATA_DIR / 'indian_medicines_filtered_5k.csv')
+    interactions_df = pd.read_csv(DATA_DIR / 'drug_interactions.csv')
+    side_effects_df = pd.read_csv(DATA_DIR / 'drug_side_effects.csv')
+    
+    with open(DATA_DIR / 'medicine_search_index.json', 'r', encoding='utf-8') as f:
+        search_index = json.load(f)
+    
+    # "Did you mean" suggestions: deletion dictionary over brand and generic names
+    # (a name's popularity is how many search index entries use it)
+    medicine_suggester = SymSpell()
+    for medicine in search_index:
+        medicine_suggester.add(medicine['name'])
+        medicine_suggester.add(medicine['generic_name'])
+    
+    # Trigram index over brand, generic and search words (shortlists fuzzy candidates)
+    medicine_fuzzy_index = TrigramIndex()
+    for position, medicine in enumerate(search_index):
+        medicine_fuzzy_index.add(medicine['name'], position)
+        medicine_fuzzy_index.add(medicine['generic_name'], position)
+        for word in medicine['search_text'].split():
+            medicine_fuzzy_index.add(word, position)
+    
+    # Char n-gram TF-IDF matrix over the same terms (one sparse product per query batch)
+    medicine_tfidf = TfidfNameSearch(medicine_fuzzy_index.terms) if SKLEARN_AVAILABLE else None
+    
+    # Pair-keyed interaction lookup (replaces per-pair DataFrame masks)
+    interaction_store = InteractionStore.from_sources(interactions_df)
+    
+    # Load symptom database (MODULE 3)
+    with open(DATA_DIR / 'symptom_search_index.json', 'r', encoding='utf-8') as f:
+        symptom_data = json.load(f)
+        symptom_search_index = symptom_data['search_index']
+        symptom_database = symptom_data['symptom_database']
+    
+    symptom_suggester = SymSpell()
+    for term in symptom_search_index:
+        symptom_suggester.add(term)
+    
+    # Fuzzy symptom lookup over every name and synonym (character-count prefilter)
+    symptom_matcher = TermMatcher(symptom_search_index)
+    
+    # Condition knowledge base compiled to symptom bitmasks
+    condition_matcher = ConditionMatcher.from_file(CONDITIONS_FILE)
+    
+    # Naive-Bayes log-likelihood tables (preprocessing/build_diagnosis_model.py),
+    # compiled from the knowledge base when that file has not been built
+    diagnosis_model = DiagnosisModel.load(DIAGNOSIS_MODEL_FILE)
+    if diagnosis_model is None:
+        diagnosis_model = DiagnosisModel.from_knowledge_base(CONDITIONS_FILE, symptom_database)
+        print(f"⚠️  diagnosis_model.npz not found - compiled the diagnosis model from {CONDITIONS_FILE.name}")
+    
+    # Keep the big read-only structures as flat arrays (fork-shared / memory-mapped)
+    search_index = FlatSearchIndex.from_records(search_index)
+    medicine_fuzzy_index = FlatTrigramIndex.from_index(medicine_fuzzy_index)
+    interaction_store = FlatInteractionStore.from_store(interaction_store)
+    
+    return {
+        'medicines_df': medicines_df,
+        'interactions_df': interactions_df,
+        'side_effects_df': side_effects_df,
+        'search_index': search_index,
+        'medicine_suggester': medicine_suggester,
+        'medicine_fuzzy_index': medicine_fuzzy_index,
+        'medicine_tfidf': medicine_tfidf,
+        'interaction_store': interaction_store,
+        'symptom_search_index': symptom_search_index,
+        'symptom_database': symptom_database,
+        'symptom_suggester': symptom_suggester,
+        'symptom_matcher': symptom_matcher,
+        'condition_matcher': condition_matcher,
+        'diagnosis_model': diagnosis_model
+    }
 
-with open(DATA_DIR / 'medicine_search_index.json', 'r', encoding='utf-8') as f:
-    search_index = json.load(f)
+def save_datasets_snapshot():
+    """Write the loaded datasets to the startup snapshot (see dataset_snapshot.py)"""
+    state = {name: globals()[name] for name in DATASET_NAMES}
+    return save_snapshot(SNAPSHOT_PATH, state, SOURCE_FILES)
+
+# Load data (prepared snapshot when it is fresh, raw files otherwise)
+print("📂 Loading datasets...")
+datasets = load_snapshot(SNAPSHOT_PATH, SOURCE_FILES)
+if datasets is not None:
+    print(f"✅ Loaded prepared datasets from snapshot {SNAPSHOT_PATH.name}")
+    if datasets['medicine_tfidf'] is None and SKLEARN_AVAILABLE:
+        datasets['medicine_tfidf'] = TfidfNameSearch(list(datasets['medicine_fuzzy_index'].terms))
+else:
+    datasets = build_datasets()
+globals().update(datasets)
 
 print(f"✅ Loaded {len(medicines_df)} medicines from CSV")
 print(f"✅ Loaded {len(search_index)} entries in search index")
 print(f"✅ Loaded {len(interactions_df)} interactions")
+print(f"✅ Built fuzzy index with {len(medicine_fuzzy_index)} searchable terms")
+print(f"✅ Indexed {len(interaction_store)} interacting drug pairs")
 
-# Build quick lookup dictionaries
-medicine_names = [m['name'].lower() for m in search_index]
-generic_names = [m['generic_name'].lower() for m in search_index]
-all_searchable_names = list(set(medicine_names + generic_names))
+# Fuzzy medicine lookups keyed on (normalized query, threshold)
+medicine_cache = LRUCache(
+    maxsize=int(os.environ.get('MEDICINE_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('MEDICINE_CACHE_TTL', 3600))
+)
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({'status': 'healthy', 'medicines': len(medicines_df)})
+    return jsonify({
+        'status': 'healthy',
+        'medicines': len(medicines_df),
+        'medicine_cache': medicine_cache.stats()
+    })
 
 def fuzzy_match(query, text, threshold=0.6):
     """Calculate fuzzy match score between query and text"""
     return SequenceMatcher(None, query.lower(), text.lower()).ratio() >= threshold
 
+def find_medicine_exact(query_lower):
+    """Search index entries whose search text contains the query"""
+    return search_index.containing(query_lower)
+
+def rank_fuzzy_scores(scores):
+    """(best_match, best_score, top 10 matches) from {search index position: score}"""
+    # Sort matches by score (ties keep search index order)
+    all_matches = sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+    if not all_matches:
+        return None, 0, []
+    
+    best_position, best_score = all_matches[0]
+    sorted_matches = [search_index[position] for position, _ in all_matches[:10]]
+    
+    return search_index[best_position], best_score, sorted_matches
+
 def find_medicine_fuzzy(query, threshold=0.7):
     """Find medicine with fuzzy matching (handles typos like Paracetomol)"""
-    query_lower = query.lower().strip()
+    query_lower = normalize_search_query(query)
+    cached = medicine_cache.get((query_lower, threshold))
+    if cached is not None:
+        return cached
     
     # 1. Exact match in search text (fastest)
-    exact_matches = [m for m in search_index if query_lower in m['search_text']]
+    exact_matches = find_medicine_exact(query_lower)
     if exact_matches:
-        return exact_matches[0], 1.0, exact_matches
+        result = exact_matches[0], 1.0, exact_matches
+    else:
+        # 2. Fuzzy match on names (trigram shortlist, then SequenceMatcher)
+        result = rank_fuzzy_scores(medicine_fuzzy_index.search(query_lower, threshold))
     
-    # 2. Fuzzy match on names
-    best_match = None
-    best_score = 0
-    all_matches = []
+    medicine_cache.put((query_lower, threshold), result)
+    return result
+
+def find_medicines_fuzzy_batch(queries, threshold=0.7):
+    """
+    find_medicine_fuzzy for many queries at once: fuzzy candidates for the
+    whole batch come from a single TF-IDF sparse matrix product
+    """
+    results = {}
+    pending = []
     
-    for medicine in search_index:
-        # Check brand name
-        score_brand = SequenceMatcher(None, query_lower, medicine['name'].lower()).ratio()
-        # Check generic name
-        score_generic = SequenceMatcher(None, query_lower, medicine['generic_name'].lower()).ratio()
-        # Check search text words
-        search_words = medicine['search_text'].split()
-        score_search = max([SequenceMatcher(None, query_lower, word).ratio() for word in search_words], default=0)
-        
-        max_score = max(score_brand, score_generic, score_search)
-        
-        if max_score >= threshold:
-            all_matches.append((medicine, max_score))
-            if max_score > best_score:
-                best_score = max_score
-                best_match = medicine
+    for query in queries:
+        query_lower = normalize_search_query(query)
+        if query_lower in results or query_lower in pending:
+            continue
+        cached = medicine_cache.get((query_lower, threshold))
+        if cached is not None:
+            results[query_lower] = cached
+            continue
+        exact_matches = find_medicine_exact(query_lower)
+        if exact_matches:
+            results[query_lower] = (exact_matches[0], 1.0, exact_matches)
+            medicine_cache.put((query_lower, threshold), results[query_lower])
+        else:
+            pending.append(query_lower)
+    
+    if medicine_tfidf is not None:
+        shortlists = medicine_tfidf.shortlist(pending)
+    else:
+        shortlists = [medicine_fuzzy_index.shortlist(query) for query in pending]
     
-    # Sort matches by score
-    all_matches.sort(key=lambda x: x[1], reverse=True)
-    sorted_matches = [m[0] for m in all_matches[:10]]
+    for query_lower, term_ids in zip(pending, shortlists):
+        results[query_lower] = rank_fuzzy_scores(medicine_fuzzy_index.score(query_lower, term_ids, threshold))
+        medicine_cache.put((query_lower, threshold), results[query_lower])
     
-    return best_match, best_score, sorted_matches
+    return [results[normalize_search_query(query)] for query in queries]
 
 @app.route('/api/search', methods=['GET'])
 def search():
@@ -134,22 +298,14 @@ def check_interaction():
     
     interactions_found = []
     
-    for i in range(len(drugs)):
-        for j in range(i + 1, len(drugs)):
-            d1, d2 = drugs[i], drugs[j]
-            
-            inter = interactions_df[
-                ((interactions_df['drug1'] == d1) & (interactions_df['drug2'] == d2)) |
-                ((interactions_df['drug1'] == d2) & (interactions_df['drug2'] == d1))
-            ]
-            
-            if not inter.empty and inter.iloc[0]['has_interaction'] == 1:
-                interactions_found.append({
-                    'drug1': d1,
-                    'drug2': d2,
-                    'severity': inter.iloc[0]['severity'],
-                    'effect': inter.iloc[0]['effect']
-                })
+    # Only pairs connected in the interaction graph are visited
+    for i, j, inter in interaction_store.interacting_pairs(drugs):
+        interactions_found.append({
+            'drug1': drugs[i],
+            'drug2': drugs[j],
+            'severity': inter['severity'],
+            'effect': inter['effect']
+        })
     
     return jsonify({
         'has_interactions': len(interactions_found) > 0,
@@ -204,7 +360,7 @@ def predict_side_effects():
     
     if not best_match:
         # Get suggestions
-        suggestions = get_close_matches(medicine_name.lower(), all_searchable_names, n=5, cutoff=0.5)
+        suggestions = medicine_suggester.lookup(medicine_name, n=5)
         
         return jsonify({
             'error': 'Medicine not found in database',
@@ -301,20 +457,17 @@ def predict_side_effects():
     
     for med in current_meds:
         # Find generic name
-        med_result = [m for m in search_index if med.lower() in m['search_text']]
+        med_result = search_index.containing(med.lower())
         med_generic = med_result[0]['generic_name'] if med_result else med
         
-        inter = interactions_df[
-            ((interactions_df['drug1'] == generic) & (interactions_df['drug2'] == med_generic)) |
-            ((interactions_df['drug1'] == med_generic) & (interactions_df['drug2'] == generic))
-        ]
+        inter = interaction_store.get(generic, med_generic)
         
-        if not inter.empty and inter.iloc[0]['has_interaction'] == 1:
-            severity = inter.iloc[0]['severity']
+        if inter:
+            severity = inter['severity']
             interaction_warnings.append({
                 'drug': med,
                 'severity': severity,
-                'effect': inter.iloc[0]['effect'],
+                'effect': inter['effect'],
                 'recommendation': 'Consult doctor immediately' if severity == 'major' else 'Monitor closely'
             })
             
@@ -410,6 +563,52 @@ def predict_side_effects():
         }
     })
 
+def resolve_interaction_medicines(med_names):
+    """
+    Validate and fuzzy-match medicine names for interaction checking (one batch).
+    Returns one (status, match) per name: status is 'skipped', 'invalid',
+    'not_found' or 'matched'
+    """
+    import re
+    resolutions = {}
+    valid_names = []
+    
+    for med_name in med_names:
+        # Skip empty
+        if not med_name or len(med_name) < 3:
+            resolutions[med_name] = ('skipped', None)
+            continue
+            
+        # Check for gibberish (vowel ratio test)
+        vowels = len(re.findall(r'[aeiouAEIOU]', med_name))
+        total = len(med_name)
+        
+        if total > 0 and vowels / total < 0.10:  # Less than 10% vowels = gibberish
+            resolutions[med_name] = ('invalid', None)
+            continue
+        
+        valid_names.append(med_name)
+    
+    # FUZZY MATCH all remaining names together
+    for med_name, (best_match, score, all_matches) in zip(
+        valid_names, find_medicines_fuzzy_batch(valid_names, threshold=0.65)
+    ):
+        if not best_match:
+            resolutions[med_name] = ('not_found', None)
+            continue
+        
+        print(f"✅ Matched: '{med_name}' → '{best_match['name']}' ({best_match['generic_name']}) [{round(score*100,1)}%]")
+        
+        # Use the generic name for interaction checking
+        resolutions[med_name] = ('matched', {
+            'input_name': med_name,
+            'matched_name': best_match['name'],
+            'generic_name': best_match['generic_name'],
+            'confidence': round(score * 100, 1)
+        })
+    
+    return [resolutions[med_name] for med_name in med_names]
+
 @app.route('/api/check-interactions', methods=['POST'])
 def check_interactions_advanced():
     """
@@ -427,99 +626,71 @@ def check_interactions_advanced():
         return jsonify({'error': 'Need at least 2 medicines to check interactions'}), 400
     
     # VALIDATION: Check each medicine name for validity with FUZZY MATCHING
-    import re
-    validated_medicines = []
-    invalid_medicines = []
-    not_found_medicines = []
-    
-    for med_name in medicines:
-        med_name = med_name.strip()
-        
-        # Skip empty
-        if not med_name or len(med_name) < 3:
-            continue
-            
-        # Check for gibberish (vowel ratio test)
-        vowels = len(re.findall(r'[aeiouAEIOU]', med_name))
-        total = len(med_name)
-        
-        if total > 0 and vowels / total < 0.10:  # Less than 10% vowels = gibberish
-            invalid_medicines.append(med_name)
-            continue
-        
-        # FUZZY MATCH to find medicine
-        best_match, score, all_matches = find_medicine_fuzzy(med_name, threshold=0.65)
-        
-        if best_match:
-            # Use the generic name for interaction checking
-            validated_medicines.append({
-                'input_name': med_name,
-                'matched_name': best_match['name'],
-                'generic_name': best_match['generic_name'],
-                'confidence': round(score * 100, 1)
-            })
-            print(f"✅ Matched: '{med_name}' → '{best_match['name']}' ({best_match['generic_name']}) [{round(score*100,1)}%]")
-        else:
-            not_found_medicines.append(med_name)
+    med_names = [med_name.strip() for med_name in medicines]
+    resolutions = [
+        (med_name, *resolution)
+        for med_name, resolution in zip(med_names, resolve_interaction_medicines(med_names))
+    ]
+    
+    response_data, status = screen_regimen(resolutions, age, weight, gender, chronic_conditions)
+    return jsonify(response_data), status
+
+def screen_regimen(resolutions, age=30, weight=70, gender='unknown', chronic_conditions=()):
+    """
+    Interaction and risk analysis for one regimen whose names are already resolved.
+    resolutions: [(med_name, status, match)] from resolve_interaction_medicines
+    Returns (response_data, http_status)
+    """
+    validated_medicines = [match for _, status, match in resolutions if status == 'matched']
+    invalid_medicines = [name for name, status, _ in resolutions if status == 'invalid']
+    not_found_medicines = [name for name, status, _ in resolutions if status == 'not_found']
     
     if invalid_medicines:
-        return jsonify({
+        return {
             'error': 'Invalid medicine names detected',
             'invalid_medicines': invalid_medicines,
             'message': 'Some medicine names appear to be gibberish. Please enter valid names.'
-        }), 400
+        }, 400
     
     if not_found_medicines:
         suggestions = []
         for med in not_found_medicines:
-            close = get_close_matches(med.lower(), all_searchable_names, n=3, cutoff=0.5)
+            close = medicine_suggester.lookup(med, n=3)
             suggestions.extend(close)
         
-        return jsonify({
+        return {
             'error': 'Some medicines not found in database',
             'not_found': not_found_medicines,
             'suggestions': list(set(suggestions))[:10],
             'message': f'Could not find: {", ".join(not_found_medicines)}'
-        }), 404
+        }, 404
     
     if len(validated_medicines) < 2:
-        return jsonify({
+        return {
             'error': 'Need at least 2 valid medicines',
             'message': 'Please provide at least 2 valid medicine names to check interactions.',
             'validated_count': len(validated_medicines)
-        }), 400
+        }, 400
     
     # AI ANALYSIS: Check all pairs for interactions (Random Forest Model Simulation)
     interactions_found = []
     
-    for i in range(len(validated_medicines)):
-        for j in range(i + 1, len(validated_medicines)):
-            med1 = validated_medicines[i]
-            med2 = validated_medicines[j]
-            
-            # Use generic names for checking
-            gen1 = med1['generic_name']
-            gen2 = med2['generic_name']
-            
-            # Check in interactions database
-            inter = interactions_df[
-                ((interactions_df['drug1'] == gen1) & (interactions_df['drug2'] == gen2)) |
-                ((interactions_df['drug1'] == gen2) & (interactions_df['drug2'] == gen1))
-            ]
-            
-            if not inter.empty and inter.iloc[0]['has_interaction'] == 1:
-                severity = inter.iloc[0]['severity']
-                effect = inter.iloc[0]['effect']
-                
-                interactions_found.append({
-                    'drug1': med1['matched_name'],
-                    'drug2': med2['matched_name'],
-                    'drug1_generic': gen1,
-                    'drug2_generic': gen2,
-                    'severity': severity,
-                    'effect': effect,
-                    'ai_confidence': 0.85  # Simulated ML confidence
-                })
+    # Intersect the regimen with each drug's interaction neighbors instead of testing every pair
+    regimen_generics = [med['generic_name'] for med in validated_medicines]
+    
+    for i, j, inter in interaction_store.interacting_pairs(regimen_generics):
+        med1 = validated_medicines[i]
+        med2 = validated_medicines[j]
+        
+        interactions_found.append({
+            'drug1': med1['matched_name'],
+            'drug2': med2['matched_name'],
+            'drug1_generic': med1['generic_name'],
+            'drug2_generic': med2['generic_name'],
+            'severity': inter['severity'],
+            'effect': inter['effect'],
+            'ai_confidence': 0.85  # Simulated ML confidence
+        })
     
     # Add chronic condition warnings (Neural Network logic)
     condition_warnings = []
@@ -634,7 +805,79 @@ def check_interactions_advanced():
         ]
     }
     
-    return jsonify(response_data)
+    return response_data, 200
+
+# Bulk screening process pool, shared by all requests (created on first use);
+# BULK_SCREENING_WORKERS is capped at the CPU count. The pool is first used
+# inside a request on the threaded server, so workers are started from a
+# forkserver (spawn where unavailable) instead of forking this process and
+# inheriting locks held by other request threads.
+CPU_COUNT = os.cpu_count() or 1
+BULK_SCREENING_WORKERS = min(int(os.environ.get('BULK_SCREENING_WORKERS', 0)) or CPU_COUNT, CPU_COUNT)
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+bulk_pool = None
+bulk_pool_lock = threading.Lock()
+
+def get_bulk_pool():
+    """Process pool for bulk screening (created on first use)"""
+    global bulk_pool
+    with bulk_pool_lock:
+        if bulk_pool is None:
+            bulk_pool = ProcessPoolExecutor(max_workers=BULK_SCREENING_WORKERS,
+                                            mp_context=multiprocessing.get_context(POOL_START_METHOD))
+        return bulk_pool
+
+def discard_bulk_pool(pool):
+    """Drop a broken bulk pool so the next request starts a fresh one"""
+    global bulk_pool
+    with bulk_pool_lock:
+        if bulk_pool is pool:
+            bulk_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def screen_regimen_job(job):
+    """Bulk screening worker: one resolved regimen -> one NDJSON result record"""
+    if len(job['resolutions']) < 2:
+        response_data, status = {'error': 'Need at least 2 medicines to check interactions'}, 400
+    else:
+        response_data, status = screen_regimen(
+            job['resolutions'], job['age'], job['weight'], job['gender'], job['chronic_conditions']
+        )
+    return {'id': job['id'], 'status': status, **response_data}
+
+@app.route('/api/bulk-check-interactions', methods=['POST'])
+def bulk_check_interactions():
+    """
+    MODULE 1 (bulk): screen many regimens in one request
+    Body: CSV or NDJSON (raw body or multipart "file"), one regimen per row/line
+    Response: NDJSON stream, one /api/check-interactions result per regimen
+    (plus "id" and "status"), written as soon as each batch is screened;
+    a failure mid-stream ends it with an {"error": ...} record
+    """
+    upload = request.files.get('file')
+    if upload:
+        # Form uploads are already buffered and get closed when the view returns
+        stream = io.BytesIO(upload.read())
+        fmt = request.args.get('format') or detect_format(upload.filename, upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = request.args.get('format') or detect_format(content_type=request.mimetype)
+    
+    def generate():
+        lines = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+        regimens = read_regimens(lines, fmt)
+        pool = get_bulk_pool()
+        try:
+            for record in screen_regimens(regimens, resolve_interaction_medicines, screen_regimen_job,
+                                          workers=BULK_SCREENING_WORKERS, pool=pool):
+                yield to_ndjson(record)
+        except Exception as e:
+            # The status line is long gone: end the stream with an error record
+            if isinstance(e, BrokenProcessPool):
+                discard_bulk_pool(pool)
+            yield to_ndjson({'error': f'Bulk screening stopped: {e}'})
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 @app.route('/api/validate-medicine', methods=['POST'])
 def validate_medicine():
@@ -674,8 +917,8 @@ def validate_medicine():
             'suggestions': [m['display_name'] for m in all_matches[:5]] if len(all_matches) > 1 else []
         })
     else:
-        # Try get_close_matches for better suggestions
-        suggestions = get_close_matches(medicine_name.lower(), all_searchable_names, n=5, cutoff=0.5)
+        # Closest names by edit distance, then popularity
+        suggestions = medicine_suggester.lookup(medicine_name, n=5)
         
         return jsonify({
             'valid': False,
@@ -708,12 +951,6 @@ def popular():
 # MODULE 3: SYMPTOM ANALYZER
 # ============================
 
-# Load symptom database
-with open(DATA_DIR / 'symptom_search_index.json', 'r', encoding='utf-8') as f:
-    symptom_data = json.load(f)
-    symptom_search_index = symptom_data['search_index']
-    symptom_database = symptom_data['symptom_database']
-
 def find_symptom_fuzzy(query, threshold=0.7):
     """Find symptom with fuzzy matching"""
     query_lower = query.lower().strip()
@@ -722,19 +959,17 @@ def find_symptom_fuzzy(query, threshold=0.7):
     if query_lower in symptom_search_index:
         return symptom_search_index[query_lower]['canonical_name'], 1.0, [query_lower]
     
-    # 2. Fuzzy matching across all variations
+    # 2. Fuzzy matching across all variations (only those that can reach the threshold are scored)
     best_match = None
     best_score = 0
     all_matches = []
     
-    for term, data in symptom_search_index.items():
-        score = SequenceMatcher(None, query_lower, term).ratio()
-        
-        if score >= threshold:
-            all_matches.append({'term': term, 'score': score, 'canonical': data['canonical_name']})
-            if score > best_score:
-                best_score = score
-                best_match = data['canonical_name']
+    for term, score in symptom_matcher.matches(query_lower, threshold):
+        data = symptom_search_index[term]
+        all_matches.append({'term': term, 'score': score, 'canonical': data['canonical_name']})
+        if score > best_score:
+            best_score = score
+            best_match = data['canonical_name']
     
     if best_match:
         return best_match, best_score, all_matches
@@ -817,98 +1052,12 @@ def calculate_symptom_risk_score(symptoms, age, weight, gender, chronic_conditio
     
     return risk_score, risk_factors, urgency
 
-def match_symptoms_to_conditions(symptoms):
-    """Match symptoms to possible medical conditions"""
-    condition_scores = {}
-    
-    # Medical condition database with symptom patterns
-    condition_database = {
-        'Common Cold': {
-            'symptoms': ['cough', 'sore_throat', 'runny_nose', 'fever', 'fatigue'],
-            'severity': 'mild',
-            'description': 'Viral upper respiratory infection'
-        },
-        'Influenza (Flu)': {
-            'symptoms': ['fever', 'chills', 'muscle_ache', 'headache', 'cough', 'fatigue'],
-            'severity': 'moderate',
-            'description': 'Viral infection affecting respiratory system'
-        },
-        'COVID-19': {
-            'symptoms': ['fever', 'cough', 'shortness_of_breath', 'fatigue', 'loss_of_appetite'],
-            'severity': 'moderate',
-            'description': 'Coronavirus respiratory infection'
-        },
-        'Gastroenteritis': {
-            'symptoms': ['nausea', 'vomiting', 'diarrhea', 'abdominal_pain', 'fever'],
-            'severity': 'moderate',
-            'description': 'Stomach and intestinal infection'
-        },
-        'Migraine': {
-            'symptoms': ['headache', 'nausea', 'vision_changes', 'dizziness'],
-            'severity': 'moderate',
-            'description': 'Severe recurring headache disorder'
-        },
-        'Bronchitis': {
-            'symptoms': ['cough', 'chest_pain', 'shortness_of_breath', 'fatigue', 'fever'],
-            'severity': 'moderate',
-            'description': 'Inflammation of bronchial tubes'
-        },
-        'Sinusitis': {
-            'symptoms': ['headache', 'runny_nose', 'fever', 'facial_pain'],
-            'severity': 'mild',
-            'description': 'Inflammation of sinus cavities'
-        },
-        'Food Poisoning': {
-            'symptoms': ['nausea', 'vomiting', 'diarrhea', 'abdominal_pain', 'fever'],
-            'severity': 'moderate',
-            'description': 'Foodborne bacterial/viral infection'
-        },
-        'Allergic Reaction': {
-            'symptoms': ['rash', 'itching', 'swelling', 'runny_nose', 'eye_pain'],
-            'severity': 'mild',
-            'description': 'Immune system response to allergen'
-        },
-        'Anxiety Disorder': {
-            'symptoms': ['anxiety', 'sweating', 'palpitations', 'shortness_of_breath', 'dizziness'],
-            'severity': 'moderate',
-            'description': 'Mental health condition causing excessive worry'
-        },
-        'Tension Headache': {
-            'symptoms': ['headache', 'muscle_ache', 'fatigue'],
-            'severity': 'mild',
-            'description': 'Most common type of headache'
-        },
-        'Dehydration': {
-            'symptoms': ['dizziness', 'fatigue', 'headache', 'dry_skin'],
-            'severity': 'moderate',
-            'description': 'Insufficient fluid intake'
-        }
-    }
-    
-    # Calculate match scores
-    for condition, data in condition_database.items():
-        matches = 0
-        for symptom in symptoms:
-            if symptom in data['symptoms']:
-                matches += 1
-        
-        if matches > 0:
-            confidence = int((matches / len(data['symptoms'])) * 100)
-            condition_scores[condition] = {
-                'confidence': confidence,
-                'severity': data['severity'],
-                'description': data['description'],
-                'matched_symptoms': matches
-            }
-    
-    # Sort by confidence
-    sorted_conditions = sorted(
-        condition_scores.items(),
-        key=lambda x: x[1]['confidence'],
-        reverse=True
-    )[:5]  # Top 5 conditions
-    
-    return sorted_conditions
+def match_symptoms_to_conditions(symptoms, age=None, gender=None):
+    """
+    Match symptoms to possible medical conditions (top 5): posterior probability
+    given age and sex when the diagnosis model is built, bitset overlap otherwise
+    """
+    return rank_conditions(diagnosis_model, condition_matcher, symptoms, age, gender, top_k=5)
 
 @app.route('/api/validate-symptoms', methods=['POST'])
 def validate_symptoms():
@@ -941,7 +1090,7 @@ def validate_symptoms():
         else:
             invalid_symptoms.append(symptom)
             # Get suggestions
-            close_matches = get_close_matches(symptom.lower(), symptom_search_index.keys(), n=3, cutoff=0.5)
+            close_matches = symptom_suggester.lookup(symptom, n=3)
             suggestions[symptom] = [symptom_search_index[m]['medical_name'] for m in close_matches]
     
     if len(validated_symptoms) == 0:
@@ -1010,7 +1159,7 @@ def analyze_symptoms():
     )
     
     # Match to conditions
-    possible_conditions = match_symptoms_to_conditions(canonical_symptoms)
+    possible_conditions = match_symptoms_to_conditions(canonical_symptoms, age, gender)
     
     # Determine overall risk level
     if emergency_detected or risk_score >= 80:
@@ -1101,6 +1250,7 @@ def analyze_symptoms():
             {
                 'name': cond[0],
                 'confidence': cond[1]['confidence'],
+                'match_percentage': cond[1]['match_percentage'],
                 'severity': cond[1]['severity'],
                 'description': cond[1]['description']
             }
@@ -1140,6 +1290,7 @@ if __name__ == '__main__':
     print("   GET  /api/medicine/<id>           - Get medicine details")
     print("   POST /api/validate-medicine       - Validate medicine name")
     print("   POST /api/check-interactions      - MODULE 1: Analyze drug interactions")
+    print("   POST /api/bulk-check-interactions - MODULE 1: Bulk screening (CSV/NDJSON → NDJSON)")
     print("   POST /api/predict-side-effects    - MODULE 2: Predict side effects")
     print("   POST /api/validate-symptoms       - Validate symptom inputs")
     print("   POST /api/analyze-symptoms        - MODULE 3: Analyze symptoms with AI")
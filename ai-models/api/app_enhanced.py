@@ -9,9 +9,21 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import pandas as pd
 import json
+import os
 import re
 from pathlib import Path
-from difflib import SequenceMatcher, get_close_matches
+from fuzzy_index import SymSpell, TermMatcher
+from interaction_store import InteractionStore
+from medicine_matcher import MedicineMatcher
+from symptom_extractor import SymptomExtractor
+from condition_matcher import ConditionMatcher
+from diagnosis_engine import DiagnosisModel, rank_conditions
+from side_effect_model import (
+    PatientCohort, contraindication_matches, overall_risk_levels, percentages, predict_probabilities
+)
+from query_cache import LRUCache, normalize_medicine_query
+from dataset_snapshot import load_snapshot, save_snapshot, snapshot_path
+from flat_arrays import FlatInteractionStore, FlatSearchIndex
 
 app = Flask(__name__)
 CORS(app)
@@ -20,6 +32,8 @@ CORS(app)
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / 'data' / 'processed'
 INDIAN_DB = BASE_DIR / 'data' / 'indian_medicines.json'
+CONDITIONS_FILE = BASE_DIR / 'knowledge_base' / 'conditions.json'
+DIAGNOSIS_MODEL_FILE = DATA_DIR / 'diagnosis_model.npz'
 
 # Load data
 print("=" * 60)
@@ -27,7 +41,35 @@ print("🚀 MediAI AI-Powered Drug Analysis System")
 print("=" * 60)
 print("\n📂 Loading datasets...")
 
-try:
+# find_medicine results keyed on the normalized query (the gibberish check runs per request)
+medicine_cache = LRUCache(
+    maxsize=int(os.environ.get('MEDICINE_CACHE_SIZE', 1024)),
+    ttl=int(os.environ.get('MEDICINE_CACHE_TTL', 3600))
+)
+
+# Raw dataset files (a startup snapshot is only used while these are unchanged)
+SOURCE_FILES = [
+    DATA_DIR / 'indian_medicines_with_generics.csv',
+    DATA_DIR / 'drug_interactions.csv',
+    DATA_DIR / 'drug_side_effects.csv',
+    DATA_DIR / 'medicine_search_index.json',
+    DATA_DIR / 'symptom_search_index.json',
+    INDIAN_DB,
+    CONDITIONS_FILE,
+    DIAGNOSIS_MODEL_FILE
+]
+SNAPSHOT_PATH = snapshot_path('app_enhanced')
+
+# Module globals restored from / saved to the snapshot
+DATASET_NAMES = (
+    'medicines_df', 'interactions_df', 'side_effects_df', 'search_index',
+    'symptom_search_index', 'symptom_database', 'indian_db',
+    'interaction_store', 'medicine_matcher', 'side_effects_by_generic', 'symptom_suggester',
+    'symptom_matcher', 'symptom_extractor', 'condition_matcher', 'diagnosis_model'
+)
+
+def build_datasets():
+    """Parse the raw dataset files and build every derived index"""
     medicines_df = pd.read_csv(DATA_DIR / 'indian_medicines_with_generics.csv')
     interactions_df = pd.read_csv(DATA_DIR / 'drug_interactions.csv')
     side_effects_df = pd.read_csv(DATA_DIR / 'drug_side_effects.csv')
@@ -45,17 +87,102 @@ try:
     with open(INDIAN_DB, 'r', encoding='utf-8') as f:
         indian_db = json.load(f)
     
-    print(f"✅ Loaded {len(medicines_df)} medicines")
-    print(f"✅ Loaded {len(indian_db['medicines'])} Indian medicines (Crocin, Dolo, etc.)")
-    print(f"✅ Loaded {len(interactions_df)} drug interactions")
-    print(f"✅ Loaded {len(side_effects_df)} side effect profiles")
-    print(f"✅ Loaded {len(symptom_database)} symptoms with {len(symptom_search_index)} variations")
-    
-except Exception as e:
-    print(f"❌ Error loading data: {e}")
-    indian_db = {'medicines': [], 'interactions': []}
-    symptom_database = {}
-    symptom_search_index = {}
+    # Merge both interaction sources into one pair-keyed store
+    interaction_store = InteractionStore.from_sources(interactions_df, indian_db['interactions'])
+    
+    # Precompiled name matcher and side effect lookup for find_medicine
+    medicine_matcher = MedicineMatcher(indian_db['medicines'], search_index)
+    side_effects_by_generic = {}
+    for generic, effects in zip(side_effects_df['generic_name'], side_effects_df['side_effects']):
+        side_effects_by_generic.setdefault(generic, effects)
+    
+    # "Did you mean" suggestions for symptoms (deletion dictionary)
+    symptom_suggester = SymSpell()
+    for term in symptom_search_index:
+        symptom_suggester.add(term)
+    
+    # Fuzzy symptom lookup over every name and synonym (character-count prefilter)
+    symptom_matcher = TermMatcher(symptom_search_index)
+    
+    # Phrase automaton over symptom synonyms and severity indicators (free-text extraction)
+    symptom_extractor = SymptomExtractor(symptom_database)
+    
+    # Condition knowledge base compiled to symptom bitmasks
+    condition_matcher = ConditionMatcher.from_file(CONDITIONS_FILE)
+    
+    # Naive-Bayes log-likelihood tables (preprocessing/build_diagnosis_model.py),
+    # compiled from the knowledge base when that file has not been built
+    diagnosis_model = DiagnosisModel.load(DIAGNOSIS_MODEL_FILE)
+    if diagnosis_model is None:
+        diagnosis_model = DiagnosisModel.from_knowledge_base(CONDITIONS_FILE, symptom_database)
+        print(f"⚠️  diagnosis_model.npz not found - compiled the diagnosis model from {CONDITIONS_FILE.name}")
+    
+    # Keep the big read-only structures as flat arrays (fork-shared / memory-mapped)
+    search_index = FlatSearchIndex.from_records(search_index)
+    interaction_store = FlatInteractionStore.from_store(interaction_store)
+    
+    return {
+        'medicines_df': medicines_df,
+        'interactions_df': interactions_df,
+        'side_effects_df': side_effects_df,
+        'search_index': search_index,
+        'symptom_search_index': symptom_search_index,
+        'symptom_database': symptom_database,
+        'indian_db': indian_db,
+        'interaction_store': interaction_store,
+        'medicine_matcher': medicine_matcher,
+        'side_effects_by_generic': side_effects_by_generic,
+        'symptom_suggester': symptom_suggester,
+        'symptom_matcher': symptom_matcher,
+        'symptom_extractor': symptom_extractor,
+        'condition_matcher': condition_matcher,
+        'diagnosis_model': diagnosis_model
+    }
+
+def load_datasets():
+    """
+    Load every dataset and derived index at startup - from the snapshot when
+    it is fresh, otherwise from the raw files
+    """
+    global indian_db, interaction_store, medicine_matcher, side_effects_by_generic
+    global symptom_database, symptom_search_index, symptom_suggester, symptom_matcher, symptom_extractor
+    global condition_matcher, diagnosis_model
+    
+    try:
+        state = load_snapshot(SNAPSHOT_PATH, SOURCE_FILES)
+        if state is not None:
+            print(f"✅ Loaded prepared datasets from snapshot {SNAPSHOT_PATH.name}")
+        else:
+            state = build_datasets()
+        globals().update(state)
+        
+        print(f"✅ Loaded {len(medicines_df)} medicines")
+        print(f"✅ Loaded {len(indian_db['medicines'])} Indian medicines (Crocin, Dolo, etc.)")
+        print(f"✅ Loaded {len(interactions_df)} drug interactions")
+        print(f"✅ Loaded {len(side_effects_df)} side effect profiles")
+        print(f"✅ Loaded {len(symptom_database)} symptoms with {len(symptom_search_index)} variations")
+        print(f"✅ Indexed {len(interaction_store)} interacting drug pairs")
+        
+    except Exception as e:
+        print(f"❌ Error loading data: {e}")
+        indian_db = {'medicines': [], 'interactions': []}
+        interaction_store = InteractionStore()
+        medicine_matcher = MedicineMatcher([], [])
+        side_effects_by_generic = {}
+        symptom_database = {}
+        symptom_search_index = {}
+        symptom_suggester = SymSpell()
+        symptom_matcher = TermMatcher([])
+        symptom_extractor = SymptomExtractor({})
+        condition_matcher = ConditionMatcher([])
+        diagnosis_model = None
+
+def save_datasets_snapshot():
+    """Write the loaded datasets to the startup snapshot (see dataset_snapshot.py)"""
+    state = {name: globals()[name] for name in DATASET_NAMES}
+    return save_snapshot(SNAPSHOT_PATH, state, SOURCE_FILES)
+
+load_datasets()
 
 print("\n🤖 AI Modules Status:")
 print("   MODULE 1: ✅ Drug Interaction Analyzer (Random Forest)")
@@ -76,9 +203,9 @@ SEVERITY_WEIGHT = {
     'contraindicated': 5
 }
 
-# Effect-specific base risk categories (Medical Evidence)
-HIGH_RISK_EFFECTS = ['bleeding', 'liver', 'ulcer', 'kidney', 'heart', 'seizure', 'overdose', 'death']
-LOW_RISK_EFFECTS = ['headache', 'nausea', 'dizziness', 'drowsiness', 'fatigue']
+# Batch side effect prediction limits (profiles x medicines per request)
+MAX_BATCH_PATIENTS = int(os.environ.get('SIDE_EFFECT_BATCH_PATIENTS', 50000))
+MAX_BATCH_MEDICINES = int(os.environ.get('SIDE_EFFECT_BATCH_MEDICINES', 20))
 
 # ============================================================================
 # HELPER FUNCTIONS
@@ -112,99 +239,97 @@ def is_valid_medicine_name(name):
     
     return has_vowel
 
+def indian_medicine_result(med):
+    """find_medicine result for an Indian database entry"""
+    return {
+        'found': True,
+        'name': med['name'],
+        'generic_name': med['generic_name'],
+        'category': med['category'],
+        'brand': med.get('brand', 'Generic'),
+        'side_effects': med.get('side_effects', []),
+        'contraindications': med.get('contraindications', []),
+        'source': 'indian_db'
+    }
+
 def find_medicine(medicine_name):
     """Search medicine in database (Indian + International) - EXACT MATCH PRIORITY"""
-    import re
-    
     # Clean the input: remove dosages like "500", "200mg", "50mcg", etc.
-    name_clean = re.sub(r'\d+\s*(mg|mcg|g|ml|iu|units?)?', '', medicine_name, flags=re.IGNORECASE).strip()
-    search_text = name_clean.lower().strip()
+    search_text = normalize_medicine_query(medicine_name)
     
     # PRIORITY 1: Exact match in Indian medicines (prevents false positives)
-    for med in indian_db['medicines']:
-        if (med['name'].lower() == search_text or 
-            med['generic_name'].lower() == search_text):
-            return {
-                'found': True,
-                'name': med['name'],
-                'generic_name': med['generic_name'],
-                'category': med['category'],
-                'brand': med.get('brand', 'Generic'),
-                'side_effects': med.get('side_effects', []),
-                'contraindications': med.get('contraindications', []),
-                'source': 'indian_db'
-            }
+    position = medicine_matcher.find_indian_exact(search_text)
+    if position is not None:
+        return indian_medicine_result(indian_db['medicines'][position])
     
     # PRIORITY 2: Partial match (but avoid combination drugs if searching for single)
-    for med in indian_db['medicines']:
-        # Skip combination drugs (e.g., "Ibuprofen + Paracetamol") if user searched for single drug
-        if '+' in med['generic_name'] and '+' not in search_text:
-            continue
-            
-        if (search_text in med['name'].lower() or 
-            search_text in med['generic_name'].lower() or
-            med['name'].lower() in search_text):
-            return {
-                'found': True,
-                'name': med['name'],
-                'generic_name': med['generic_name'],
-                'category': med['category'],
-                'brand': med.get('brand', 'Generic'),
-                'side_effects': med.get('side_effects', []),
-                'contraindications': med.get('contraindications', []),
-                'source': 'indian_db'
-            }
+    position = medicine_matcher.find_indian_partial(search_text)
+    if position is not None:
+        return indian_medicine_result(indian_db['medicines'][position])
     
     # Search international database
-    for item in search_index:
-        if search_text in item['search_text']:
-            # Get side effects for this medicine
-            se = side_effects_df[side_effects_df['generic_name'] == item['generic_name']]
-            effects = json.loads(se.iloc[0]['side_effects']) if not se.empty else []
-            
-            return {
-                'found': True,
-                'name': item['display_name'],
-                'generic_name': item['generic_name'],
-                'category': item.get('category', 'Unknown'),
-                'brand': 'Various',
-                'side_effects': effects,
-                'contraindications': [],
-                'source': 'international_db'
-            }
+    position = medicine_matcher.find_international(search_text)
+    if position is not None:
+        item = search_index[position]
+        # Get side effects for this medicine
+        effects = side_effects_by_generic.get(item['generic_name'])
+        effects = json.loads(effects) if effects is not None else []
+        
+        return {
+            'found': True,
+            'name': item['display_name'],
+            'generic_name': item['generic_name'],
+            'category': item.get('category', 'Unknown'),
+            'brand': 'Various',
+            'side_effects': effects,
+            'contraindications': [],
+            'source': 'international_db'
+        }
     
     return {'found': False}
 
+def resolve_medicine(medicine_name):
+    """
+    Gibberish check on the name as entered + find_medicine, cached on the
+    normalized query. Returns (is_valid, result); result is None for invalid
+    names. Cached results are shared between requests - treat them as read-only.
+    """
+    if not is_valid_medicine_name(medicine_name):
+        return False, None
+    
+    search_text = normalize_medicine_query(medicine_name)
+    return True, medicine_cache.get_or_compute(search_text, lambda: find_medicine(search_text))
+
 def check_drug_pair_interaction(drug1_generic, drug2_generic):
     """Check if two drugs interact (Random Forest logic)"""
-    # Check in interactions database
-    inter = interactions_df[
-        ((interactions_df['drug1'] == drug1_generic) & (interactions_df['drug2'] == drug2_generic)) |
-        ((interactions_df['drug1'] == drug2_generic) & (interactions_df['drug2'] == drug1_generic))
-    ]
+    # Interactions dataset first, then Indian medicines (merged at load time)
+    interaction = interaction_store.get(drug1_generic, drug2_generic)
     
-    if not inter.empty and inter.iloc[0]['has_interaction'] == 1:
+    if interaction:
         return {
             'has_interaction': True,
-            'severity': inter.iloc[0]['severity'],
-            'effect': inter.iloc[0]['effect'],
-            'recommendation': get_recommendation(inter.iloc[0]['severity'])
+            'severity': interaction['severity'],
+            'effect': interaction['effect'],
+            'recommendation': interaction['recommendation'] or get_recommendation(interaction['severity'])
         }
     
-    # Check Indian medicines interactions (exact match only, no substring matching)
-    for interaction in indian_db['interactions']:
-        # FIXED: Check exact matches only (not substring)
-        if ((interaction['drug1'] == drug1_generic and interaction['drug2'] == drug2_generic) or 
-            (interaction['drug1'] == drug2_generic and interaction['drug2'] == drug1_generic)):
-            return {
-                'has_interaction': True,
-                'severity': interaction['severity'],
-                'effect': interaction['effect'],
-                'recommendation': interaction['recommendation']
-            }
-    
     return {'has_interaction': False, 'severity': 'none', 'effect': 'No known interactions'}
 
+def find_regimen_interactions(generic_names):
+    """
+    All interacting pairs in a regimen as (i, j, interaction), using the
+    interaction graph so only pairs that actually interact are visited
+    """
+    found = []
+    for i, j, interaction in interaction_store.interacting_pairs(generic_names):
+        found.append((i, j, {
+            'has_interaction': True,
+            'severity': interaction['severity'],
+            'effect': interaction['effect'],
+            'recommendation': interaction['recommendation'] or get_recommendation(interaction['severity'])
+        }))
+    return found
+
 def get_recommendation(severity):
     """Get AI recommendation based on severity"""
     if severity == 'major':
@@ -264,7 +389,8 @@ def health():
             'module_2': 'Side Effect Predictor (Neural Network)'
         },
         'medicines_count': len(medicines_df) + len(indian_db['medicines']),
-        'validation': 'enabled'
+        'validation': 'enabled',
+        'medicine_cache': medicine_cache.stats()
     })
 
 @app.route('/api/validate-medicine', methods=['POST'])
@@ -279,17 +405,15 @@ def validate_medicine():
         if not medicine_name:
             return jsonify({'valid': False, 'message': 'Medicine name is required'}), 400
         
-        # Gibberish detection
-        if not is_valid_medicine_name(medicine_name):
+        # Gibberish detection + database search (cached)
+        is_valid, result = resolve_medicine(medicine_name)
+        if not is_valid:
             return jsonify({
                 'valid': False,
                 'message': '❌ Invalid medicine name detected. Please enter a real medicine.',
                 'suggestions': ['Crocin', 'Dolo 650', 'Paracetamol', 'Aspirin', 'Ibuprofen', 'Amoxicillin']
             }), 400
         
-        # Search in database
-        result = find_medicine(medicine_name)
-        
         if result['found']:
             return jsonify({
                 'valid': True,
@@ -341,13 +465,13 @@ def check_interactions():
         # Validate all medicines
         validated_medicines = []
         for med_name in medicines:
-            if not is_valid_medicine_name(med_name):
+            is_valid, result = resolve_medicine(med_name)
+            if not is_valid:
                 return jsonify({
                     'error': f'Invalid medicine name: {med_name}',
                     'message': 'Please enter real medicine names only'
                 }), 400
             
-            result = find_medicine(med_name)
             if not result['found']:
                 return jsonify({
                     'error': f'Medicine not found: {med_name}',
@@ -360,27 +484,21 @@ def check_interactions():
         interactions_found = []
         interaction_risk_score = 0
         
-        for i in range(len(validated_medicines)):
-            for j in range(i + 1, len(validated_medicines)):
-                drug1 = validated_medicines[i]
-                drug2 = validated_medicines[j]
-                
-                interaction = check_drug_pair_interaction(
-                    drug1['generic_name'],
-                    drug2['generic_name']
-                )
-                
-                if interaction['has_interaction']:
-                    severity = interaction['severity']
-                    interactions_found.append({
-                        'drug1': drug1['name'],
-                        'drug2': drug2['name'],
-                        'severity': severity,
-                        'effect': interaction['effect'],
-                        'recommendation': interaction['recommendation']
-                    })
-                    # Add weighted risk score (major interactions matter more)
-                    interaction_risk_score += SEVERITY_WEIGHT.get(severity, 1)
+        regimen_generics = [drug['generic_name'] for drug in validated_medicines]
+        
+        for i, j, interaction in find_regimen_interactions(regimen_generics):
+            drug1 = validated_medicines[i]
+            drug2 = validated_medicines[j]
+            severity = interaction['severity']
+            interactions_found.append({
+                'drug1': drug1['name'],
+                'drug2': drug2['name'],
+                'severity': severity,
+                'effect': interaction['effect'],
+                'recommendation': interaction['recommendation']
+            })
+            # Add weighted risk score (major interactions matter more)
+            interaction_risk_score += SEVERITY_WEIGHT.get(severity, 1)
         
         # Calculate overall risk (Neural Network with weighted interaction score)
         risk_level, risk_score = calculate_risk_score(
@@ -458,16 +576,26 @@ def predict_side_effects():
         if not medicine_name:
             return jsonify({'error': 'Medicine name required'}), 400
         
-        # Validate medicine
-        if not is_valid_medicine_name(medicine_name):
+        try:
+            cohort = PatientCohort([{
+                'age': age,
+                'weight': weight,
+                'gender': gender,
+                'chronic_conditions': chronic_conditions,
+                'current_medications': current_medications
+            }])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Validate and find medicine (cached)
+        is_valid, medicine = resolve_medicine(medicine_name)
+        if not is_valid:
             return jsonify({
                 'error': 'Invalid medicine name detected',
                 'message': 'Please enter a real medicine name',
                 'suggestions': ['Crocin', 'Paracetamol', 'Aspirin', 'Ibuprofen']
             }), 400
         
-        # Find medicine
-        medicine = find_medicine(medicine_name)
         if not medicine['found']:
             return jsonify({
                 'error': f'Medicine "{medicine_name}" not found',
@@ -478,69 +606,23 @@ def predict_side_effects():
         base_side_effects = medicine['side_effects']
         
         # Check contraindications against patient conditions (Critical medical check)
-        contra_risk = 0
-        contraindication_warnings = []
-        for condition in chronic_conditions:
-            for contra in medicine.get('contraindications', []):
-                if condition.lower() in contra.lower() or contra.lower() in condition.lower():
-                    contra_risk += 1
-                    contraindication_warnings.append(
-                        f'⚠️ CONTRAINDICATION: {medicine["name"]} is contraindicated for {condition}'
-                    )
+        contraindication_warnings = [
+            f'⚠️ CONTRAINDICATION: {medicine["name"]} is contraindicated for {condition}'
+            for condition, _ in contraindication_matches(chronic_conditions, medicine.get('contraindications', []))
+        ]
         
-        # Neural Network prediction - adjust probabilities based on patient
-        predicted_side_effects = []
+        # Neural Network prediction - adjust probabilities based on patient (multiplier tables)
+        probabilities, contra_counts = predict_probabilities(
+            base_side_effects, cohort, medicine.get('contraindications', [])
+        )
+        contra_risk = int(contra_counts[0])
+        rounded, average = percentages(probabilities)
         
-        for effect in base_side_effects:
-            # Effect-specific base risk (Medical evidence-based)
-            effect_lower = effect.lower()
-            
-            if any(x in effect_lower for x in HIGH_RISK_EFFECTS):
-                base_prob = 0.25  # High-risk effects start higher
-            elif any(x in effect_lower for x in LOW_RISK_EFFECTS):
-                base_prob = 0.10  # Low-risk effects start lower
-            else:
-                base_prob = 0.12  # Default medium risk
-            
-            # Age adjustment (Hidden layer 1)
-            if age < 12:
-                base_prob *= 1.8  # Children 80% higher risk
-            elif age < 18:
-                base_prob *= 1.3
-            elif age > 75:
-                base_prob *= 1.6  # Elderly 60% higher risk
-            elif age > 65:
-                base_prob *= 1.4
-            
-            # Weight adjustment (Hidden layer 2)
-            if weight < 50:
-                base_prob *= 1.3  # Underweight - higher risk
-            elif weight > 100:
-                base_prob *= 1.2  # Overweight - slightly higher risk
-            
-            # Gender adjustment (Hidden layer 3)
-            if gender.lower() in ['female', 'f']:
-                if 'nausea' in effect.lower():
-                    base_prob *= 1.2
-            
-            # Chronic conditions (Hidden layer 4)
-            if chronic_conditions:
-                base_prob *= (1 + len(chronic_conditions) * 0.15)
-            
-            # Drug interactions (Input from Random Forest)
-            if current_medications:
-                base_prob *= (1 + len(current_medications) * 0.1)
-            
-            # Contraindication escalation (CRITICAL medical logic)
-            if contra_risk > 0:
-                base_prob *= (1 + contra_risk * 0.5)
-            
-            # Cap at 95%
-            final_prob = min(0.95, base_prob)
-            
+        predicted_side_effects = []
+        for effect, final_prob, percentage in zip(base_side_effects, probabilities[0].tolist(), rounded[0].tolist()):
             predicted_side_effects.append({
                 'side_effect': effect,
-                'probability': round(final_prob * 100, 1),
+                'probability': percentage,
                 'severity': 'high' if final_prob > 0.5 else 'moderate' if final_prob > 0.25 else 'low'
             })
         
@@ -548,7 +630,7 @@ def predict_side_effects():
         predicted_side_effects.sort(key=lambda x: x['probability'], reverse=True)
         
         # Calculate overall risk (Output layer)
-        avg_prob = sum(se['probability'] for se in predicted_side_effects) / len(predicted_side_effects) if predicted_side_effects else 0
+        avg_prob = float(average[0])
         overall_risk = 'high' if avg_prob > 40 else 'moderate' if avg_prob > 20 else 'low'
         
         # Personalized recommendations
@@ -614,6 +696,86 @@ def predict_side_effects():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/predict-side-effects/batch', methods=['POST'])
+def predict_side_effects_batch():
+    """
+    MODULE 2 (cohort): Side effect probabilities for many patient profiles
+    Same adjustments as /api/predict-side-effects, scored as one
+    (patients x side effects) matrix per medicine
+    
+    Expected input:
+    {
+        "medicines": ["Crocin", "Aspirin"],
+        "patients": [
+            {"age": 25, "weight": 70, "gender": "male",
+             "chronic_conditions": ["Diabetes"], "current_medications": ["Metformin"]},
+            ...
+        ]
+    }
+    "probabilities" rows follow the order of "patients", columns the order
+    of "side_effects" (percentages)
+    """
+    try:
+        data = request.json or {}
+        medicine_names = data.get('medicines') or data.get('medicine') or []
+        if isinstance(medicine_names, str):
+            medicine_names = [medicine_names]
+        patients = data.get('patients', [])
+        
+        if not isinstance(medicine_names, list) or not medicine_names:
+            return jsonify({'error': 'At least one medicine required'}), 400
+        if not isinstance(patients, list) or not patients:
+            return jsonify({'error': 'At least one patient profile required'}), 400
+        if len(medicine_names) > MAX_BATCH_MEDICINES or len(patients) > MAX_BATCH_PATIENTS:
+            return jsonify({
+                'error': 'Batch too large',
+                'max_medicines': MAX_BATCH_MEDICINES,
+                'max_patients': MAX_BATCH_PATIENTS
+            }), 400
+        
+        try:
+            cohort = PatientCohort(patients)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        results = []
+        not_found = []
+        for medicine_name in medicine_names:
+            is_valid, medicine = resolve_medicine(str(medicine_name).strip())
+            if not is_valid or not medicine['found']:
+                not_found.append(medicine_name)
+                continue
+            
+            side_effects = medicine['side_effects']
+            probabilities, contra_counts = predict_probabilities(
+                side_effects, cohort, medicine.get('contraindications', [])
+            )
+            rounded, average = percentages(probabilities)
+            
+            results.append({
+                'query': medicine_name,
+                'medicine': {
+                    'name': medicine['name'],
+                    'generic': medicine['generic_name'],
+                    'category': medicine['category']
+                },
+                'side_effects': side_effects,
+                'probabilities': rounded.tolist(),
+                'average_probability': [round(value, 1) for value in average.tolist()],
+                'overall_risk': overall_risk_levels(average).tolist(),
+                'contraindication_risk': contra_counts.astype(int).tolist()
+            })
+        
+        return jsonify({
+            'module': 'MODULE 2: Side Effect Predictor (Neural Network, cohort)',
+            'patients': len(cohort),
+            'results': results,
+            'not_found': not_found
+        })
+    
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/search', methods=['GET'])
 def search_medicines():
     """Search medicines by name"""
@@ -633,14 +795,13 @@ def search_medicines():
             })
     
     # Search international
-    for item in search_index:
-        if query in item['search_text']:
-            results.append({
-                'name': item['display_name'],
-                'generic': item['generic_name'],
-                'category': item.get('category', 'Unknown'),
-                'source': 'International'
-            })
+    for item in search_index.containing(query):
+        results.append({
+            'name': item['display_name'],
+            'generic': item['generic_name'],
+            'category': item.get('category', 'Unknown'),
+            'source': 'International'
+        })
     
     return jsonify({'results': results[:limit]})
 
@@ -670,19 +831,17 @@ def find_symptom_fuzzy(query, threshold=0.7):
     if query_lower in symptom_search_index:
         return symptom_search_index[query_lower]['canonical_name'], 1.0, [query_lower]
     
-    # 2. Fuzzy matching
+    # 2. Fuzzy matching (only the variations that can reach the threshold are scored)
     best_match = None
     best_score = 0
     all_matches = []
     
-    for term, data in symptom_search_index.items():
-        score = SequenceMatcher(None, query_lower, term).ratio()
-        
-        if score >= threshold:
-            all_matches.append({'term': term, 'score': score, 'canonical': data['canonical_name']})
-            if score > best_score:
-                best_score = score
-                best_match = data['canonical_name']
+    for term, score in symptom_matcher.matches(query_lower, threshold):
+        data = symptom_search_index[term]
+        all_matches.append({'term': term, 'score': score, 'canonical': data['canonical_name']})
+        if score > best_score:
+            best_score = score
+            best_match = data['canonical_name']
     
     if best_match:
         return best_match, best_score, all_matches
@@ -765,104 +924,12 @@ def calculate_symptom_risk_score(symptoms, age, weight, gender, chronic_conditio
     
     return risk_score, risk_factors, urgency
 
-def match_symptoms_to_conditions(symptoms):
-    """Match symptoms to possible medical conditions"""
-    condition_patterns = {
-        'Common Cold': {
-            'required': ['cough', 'runny_nose'],
-            'optional': ['fever', 'fatigue', 'sore_throat', 'headache'],
-            'severity': 'mild',
-            'description': 'A viral upper respiratory tract infection'
-        },
-        'Influenza (Flu)': {
-            'required': ['fever', 'muscle_pain'],
-            'optional': ['cough', 'fatigue', 'chills', 'headache', 'sore_throat'],
-            'severity': 'moderate',
-            'description': 'A viral infection affecting the respiratory system'
-        },
-        'COVID-19': {
-            'required': ['fever', 'cough'],
-            'optional': ['fatigue', 'shortness_of_breath', 'loss_of_taste_or_smell', 'muscle_pain', 'headache'],
-            'severity': 'moderate_to_severe',
-            'description': 'Coronavirus disease caused by SARS-CoV-2'
-        },
-        'Gastroenteritis': {
-            'required': ['nausea', 'diarrhea'],
-            'optional': ['vomiting', 'abdominal_pain', 'fever', 'fatigue'],
-            'severity': 'moderate',
-            'description': 'Inflammation of the stomach and intestines'
-        },
-        'Migraine': {
-            'required': ['headache'],
-            'optional': ['nausea', 'sensitivity_to_light', 'sensitivity_to_sound', 'vomiting', 'vision_changes'],
-            'severity': 'moderate',
-            'description': 'A neurological condition causing severe headaches'
-        },
-        'Bronchitis': {
-            'required': ['cough', 'chest_pain'],
-            'optional': ['fatigue', 'shortness_of_breath', 'wheezing', 'fever'],
-            'severity': 'moderate',
-            'description': 'Inflammation of the bronchial tubes'
-        },
-        'Sinusitis': {
-            'required': ['headache', 'runny_nose'],
-            'optional': ['facial_pain', 'cough', 'fever', 'loss_of_taste_or_smell'],
-            'severity': 'mild_to_moderate',
-            'description': 'Inflammation of the sinuses'
-        },
-        'Food Poisoning': {
-            'required': ['nausea', 'vomiting', 'diarrhea'],
-            'optional': ['abdominal_pain', 'fever', 'weakness'],
-            'severity': 'moderate',
-            'description': 'Illness caused by consuming contaminated food'
-        },
-        'Allergic Reaction': {
-            'required': ['rash', 'itching'],
-            'optional': ['swelling', 'shortness_of_breath', 'runny_nose', 'sneezing'],
-            'severity': 'mild_to_severe',
-            'description': 'Immune system response to an allergen'
-        },
-        'Anxiety Disorder': {
-            'required': ['anxiety'],
-            'optional': ['rapid_heartbeat', 'shortness_of_breath', 'sweating', 'dizziness', 'insomnia'],
-            'severity': 'mild_to_moderate',
-            'description': 'Mental health condition characterized by excessive worry'
-        },
-        'Tension Headache': {
-            'required': ['headache'],
-            'optional': ['neck_pain', 'fatigue', 'difficulty_concentrating'],
-            'severity': 'mild',
-            'description': 'The most common type of headache caused by muscle tension'
-        },
-        'Dehydration': {
-            'required': ['dizziness', 'fatigue'],
-            'optional': ['dry_mouth', 'thirst', 'weakness', 'confusion'],
-            'severity': 'mild_to_moderate',
-            'description': 'Condition resulting from excessive loss of body fluids'
-        }
-    }
-    
-    condition_scores = []
-    
-    for condition_name, pattern in condition_patterns.items():
-        required_count = sum(1 for s in pattern['required'] if s in symptoms)
-        optional_count = sum(1 for s in pattern['optional'] if s in symptoms)
-        
-        required_percentage = (required_count / len(pattern['required'])) * 100 if pattern['required'] else 0
-        optional_percentage = (optional_count / len(pattern['optional'])) * 100 if pattern['optional'] else 0
-        
-        overall_confidence = (required_percentage * 0.7) + (optional_percentage * 0.3)
-        
-        if overall_confidence > 0:
-            condition_scores.append((condition_name, {
-                'confidence': round(overall_confidence, 1),
-                'severity': pattern['severity'],
-                'description': pattern['description']
-            }))
-    
-    # Sort by confidence and return top 5
-    condition_scores.sort(key=lambda x: x[1]['confidence'], reverse=True)
-    return condition_scores[:5]
+def match_symptoms_to_conditions(symptoms, age=None, gender=None):
+    """
+    Match symptoms to possible medical conditions (top 5): posterior probability
+    given age and sex when the diagnosis model is built, bitset overlap otherwise
+    """
+    return rank_conditions(diagnosis_model, condition_matcher, symptoms, age, gender, top_k=5)
 
 @app.route('/api/validate-symptoms', methods=['POST'])
 def validate_symptoms():
@@ -886,7 +953,7 @@ def validate_symptoms():
         else:
             invalid.append(symptom)
             # Get close suggestions
-            close_matches = get_close_matches(symptom.lower(), symptom_search_index.keys(), n=3, cutoff=0.5)
+            close_matches = symptom_suggester.lookup(symptom, n=3)
             if close_matches:
                 suggestions[symptom] = [symptom_search_index[m]['canonical_name'] for m in close_matches]
     
@@ -896,6 +963,19 @@ def validate_symptoms():
         'suggestions': suggestions
     })
 
+@app.route('/api/extract-symptoms', methods=['POST'])
+def extract_symptoms():
+    """Find symptoms, severity phrases and emergency flags in a free-text description"""
+    data = request.json or {}
+    text = data.get('text', '')
+    
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': 'Text describing the symptoms is required'}), 400
+    
+    result = symptom_extractor.extract(text)
+    result['canonical_symptoms'] = [symptom['canonical'] for symptom in result['symptoms']]
+    return jsonify(result)
+
 @app.route('/api/analyze-symptoms', methods=['POST'])
 def analyze_symptoms():
     """MODULE 3: Analyze symptoms with AI-powered pattern matching"""
@@ -939,7 +1019,7 @@ def analyze_symptoms():
         )
         
         # Match to conditions
-        possible_conditions = match_symptoms_to_conditions(symptom_keys)
+        possible_conditions = match_symptoms_to_conditions(symptom_keys, age, gender)
         
         # Generate recommendations
         recommendations = {
@@ -1010,6 +1090,7 @@ def analyze_symptoms():
                 {
                     'name': cond[0],
                     'confidence': cond[1]['confidence'],
+                    'match_percentage': cond[1]['match_percentage'],
                     'severity': cond[1]['severity'],
                     'description': cond[1]['description']
                 }
@@ -1047,99 +1128,6 @@ def analyze_symptoms():
     
     return risk_score, risk_factors, urgency
 
-def match_symptoms_to_conditions(symptoms):
-    """Match symptoms to possible medical conditions"""
-    condition_scores = {}
-    
-    # Medical condition database
-    condition_database = {
-        'Common Cold': {
-            'symptoms': ['cough', 'sore_throat', 'runny_nose', 'fever', 'fatigue'],
-            'severity': 'mild',
-            'description': 'Viral upper respiratory infection'
-        },
-        'Influenza (Flu)': {
-            'symptoms': ['fever', 'chills', 'muscle_ache', 'headache', 'cough', 'fatigue'],
-            'severity': 'moderate',
-            'description': 'Viral infection affecting respiratory system'
-        },
-        'COVID-19': {
-            'symptoms': ['fever', 'cough', 'shortness_of_breath', 'fatigue', 'loss_of_appetite'],
-            'severity': 'moderate',
-            'description': 'Coronavirus respiratory infection'
-        },
-        'Gastroenteritis': {
-            'symptoms': ['nausea', 'vomiting', 'diarrhea', 'abdominal_pain', 'fever'],
-            'severity': 'moderate',
-            'description': 'Stomach and intestinal infection'
-        },
-        'Migraine': {
-            'symptoms': ['headache', 'nausea', 'vision_changes', 'dizziness'],
-            'severity': 'moderate',
-            'description': 'Severe recurring headache disorder'
-        },
-        'Bronchitis': {
-            'symptoms': ['cough', 'chest_pain', 'shortness_of_breath', 'fatigue', 'fever'],
-            'severity': 'moderate',
-            'description': 'Inflammation of bronchial tubes'
-        },
-        'Sinusitis': {
-            'symptoms': ['headache', 'runny_nose', 'fever'],
-            'severity': 'mild',
-            'description': 'Inflammation of sinus cavities'
-        },
-        'Food Poisoning': {
-            'symptoms': ['nausea', 'vomiting', 'diarrhea', 'abdominal_pain', 'fever'],
-            'severity': 'moderate',
-            'description': 'Foodborne bacterial/viral infection'
-        },
-        'Allergic Reaction': {
-            'symptoms': ['rash', 'itching', 'swelling', 'runny_nose', 'eye_pain'],
-            'severity': 'mild',
-            'description': 'Immune system response to allergen'
-        },
-        'Anxiety Disorder': {
-            'symptoms': ['anxiety', 'sweating', 'shortness_of_breath', 'dizziness'],
-            'severity': 'moderate',
-            'description': 'Mental health condition causing excessive worry'
-        },
-        'Tension Headache': {
-            'symptoms': ['headache', 'muscle_ache', 'fatigue'],
-            'severity': 'mild',
-            'description': 'Most common type of headache'
-        },
-        'Dehydration': {
-            'symptoms': ['dizziness', 'fatigue', 'headache'],
-            'severity': 'moderate',
-            'description': 'Insufficient fluid intake'
-        }
-    }
-    
-    # Calculate match scores
-    for condition, data in condition_database.items():
-        matches = 0
-        for symptom in symptoms:
-            if symptom in data['symptoms']:
-                matches += 1
-        
-        if matches > 0:
-            confidence = int((matches / len(data['symptoms'])) * 100)
-            condition_scores[condition] = {
-                'confidence': confidence,
-                'severity': data['severity'],
-                'description': data['description'],
-                'matched_symptoms': matches
-            }
-    
-    # Sort by confidence
-    sorted_conditions = sorted(
-        condition_scores.items(),
-        key=lambda x: x[1]['confidence'],
-        reverse=True
-    )[:5]
-    
-    return sorted_conditions
-
 if __name__ == '__main__':
     print("\n🚀 Starting MediAI AI-Powered API...")
     print("   📍 http://127.0.0.1:8001")
@@ -0,0 +1,184 @@
+"""
+MediAI - Bulk Regimen Screening
+Screens many prescriptions in one pass: regimens are read from CSV or NDJSON,
+every distinct medicine name is resolved once, interaction/risk analysis is
+fanned out over a process pool and results stream back as NDJSON lines.
+
+CSV columns: id, medicines (separated by ';' or '|'), age, weight, gender,
+chronic_conditions (same separators). NDJSON lines use the same keys as
+POST /api/check-interactions plus an optional "id".
+
+CLI:
+    python bulk_screening.py regimens.csv > results.ndjson
+    python bulk_screening.py regimens.ndjson --workers 8 --output results.ndjson
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from itertools import islice
+
+BATCH_SIZE = 500
+LIST_SEPARATOR = re.compile(r'[;|]')
+
+
+def detect_format(filename=None, content_type=None):
+    """Guess 'csv' or 'ndjson' from a file name or content type (default: ndjson)"""
+    filename = (filename or '').lower()
+    content_type = (content_type or '').lower()
+    if filename.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return 'ndjson'
+
+
+def split_list(value):
+    """'Crocin; Aspirin|Warfarin' -> ['Crocin', 'Aspirin', 'Warfarin']"""
+    if isinstance(value, list):
+        return value
+    if not value:
+        return []
+    return [item.strip() for item in LIST_SEPARATOR.split(str(value)) if item.strip()]
+
+
+def to_number(value, default, cast):
+    """Cast a CSV/JSON field to int/float, falling back to the endpoint default"""
+    if value in (None, ''):
+        return default
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def normalize_regimen(record, line_number):
+    """Turn a raw CSV row / JSON object into a regimen job"""
+    return {
+        'id': line_number if record.get('id') in (None, '') else record['id'],
+        'medicines': split_list(record.get('medicines')),
+        'age': to_number(record.get('age'), 30, int),
+        'weight': to_number(record.get('weight'), 70, float),
+        'gender': record.get('gender') or 'unknown',
+        'chronic_conditions': split_list(record.get('chronic_conditions'))
+    }
+
+
+def read_regimens(lines, fmt='ndjson'):
+    """Yield regimen jobs from an iterable of text lines (malformed lines become error jobs)"""
+    if fmt == 'csv':
+        for line_number, row in enumerate(csv.DictReader(lines), start=1):
+            yield normalize_regimen(row, line_number)
+        return
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {'id': line_number, 'error': f'Malformed regimen: {e}'}
+            continue
+        if not isinstance(record, dict):
+            yield {'id': line_number, 'error': 'Malformed regimen: expected a JSON object'}
+            continue
+        yield normalize_regimen(record, line_number)
+
+
+def run_job(task):
+    """Process-pool entry point: (screen, job) -> result record"""
+    screen, job = task
+    if 'error' in job:
+        return {'id': job['id'], 'status': 400, 'error': job['error']}
+    return screen(job)
+
+
+def screen_regimens(regimens, resolve, screen, workers=None, batch_size=BATCH_SIZE, pool=None):
+    """
+    Yield one result record per regimen, in input order.
+
+    resolve(names) -> resolutions, called once per batch (in this process) with
+                      the medicine names not seen before, so each is resolved once
+    screen(job)    -> result dict, run on the process pool; job['resolutions'] holds
+                      (name, *resolution) for each medicine of the regimen
+    pool           -> executor to run on (left running, e.g. the API's shared pool);
+                      without one a private pool of `workers` processes is used
+    """
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+            yield from screen_regimens(regimens, resolve, screen, workers, batch_size, pool)
+        return
+
+    regimens = iter(regimens)
+    resolved = {}
+    pool_size = workers or os.cpu_count() or 1
+
+    while True:
+        batch = list(islice(regimens, batch_size))
+        if not batch:
+            break
+
+        new_names = []
+        for job in batch:
+            if 'error' not in job:
+                job['medicines'] = [str(name).strip() for name in job['medicines']]
+                for name in job['medicines']:
+                    if name not in resolved:
+                        resolved[name] = None
+                        new_names.append(name)
+        resolved.update(zip(new_names, resolve(new_names)))
+
+        tasks = []
+        for job in batch:
+            if 'error' not in job:
+                job['resolutions'] = [(name, *resolved[name]) for name in job['medicines']]
+            tasks.append((screen, job))
+
+        chunksize = max(1, len(tasks) // (pool_size * 4))
+        yield from pool.map(run_job, tasks, chunksize=chunksize)
+
+
+def to_ndjson(record):
+    """One NDJSON line (numpy scalars and other oddities fall back to str)"""
+    return json.dumps(record, ensure_ascii=False, default=str) + '\n'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk drug interaction screening')
+    parser.add_argument('input', help='CSV or NDJSON file with one regimen per row/line ("-" for stdin)')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format (default: from file extension)')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size (default: CPU count)')
+    parser.add_argument('--output', help='Write NDJSON here instead of stdout')
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.input)
+    source = sys.stdin if args.input == '-' else open(args.input, 'r', encoding='utf-8', newline='')
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+
+    # The API logs to stdout, keep it off the NDJSON stream
+    screened = 0
+    with redirect_stdout(sys.stderr):
+        # Loads the datasets and indexes once (pool workers inherit or re-import them)
+        import app
+
+        try:
+            regimens = read_regimens(source, fmt)
+            for record in screen_regimens(regimens, app.resolve_interaction_medicines,
+                                          app.screen_regimen_job, workers=args.workers):
+                output.write(to_ndjson(record))
+                screened += 1
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if output is not sys.stdout:
+                output.close()
+
+    print(f"✅ Screened {screened} regimens", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
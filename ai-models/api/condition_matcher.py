@@ -0,0 +1,117 @@
+"""
+MediAI - Bitset Condition Matcher
+The condition knowledge base (ai-models/knowledge_base/conditions.json)
+compiled once at startup: every symptom gets a bit position, each
+condition's required and optional symptom sets become bitmask rows of a
+NumPy matrix, and scoring a request is an AND plus a popcount over all
+conditions at once instead of Python list membership tests.
+"""
+
+import json
+
+import numpy as np
+
+# Set bits per byte value (popcount lookup; np.bitwise_count needs NumPy 2)
+POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+# Share of the confidence carried by the required / optional symptoms
+REQUIRED_WEIGHT = 0.7
+OPTIONAL_WEIGHT = 0.3
+
+
+def load_conditions(path):
+    """Condition records from a knowledge base file"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['conditions']
+
+
+class ConditionMatcher:
+    """
+    Scores conditions against a set of canonical symptoms.
+
+    confidence = 70% x share of required symptoms present
+               + 30% x share of optional symptoms present
+    match_percentage keeps the earlier integer score of /api/analyze-symptoms
+    (share of all the condition's symptoms present) for callers that sort
+    or display it. Conditions with no matching symptom are left out; ties
+    keep the knowledge base order.
+    """
+
+    def __init__(self, conditions):
+        self.conditions = list(conditions)
+        self.rows = {condition['name']: row for row, condition in enumerate(self.conditions)}
+        symptoms = sorted({symptom for condition in self.conditions
+                           for symptom in condition['required'] + condition['optional']})
+        self.bits = {symptom: bit for bit, symptom in enumerate(symptoms)}
+
+        width = max(1, (len(symptoms) + 7) // 8)
+        self.required = np.zeros((len(self.conditions), width), dtype=np.uint8)
+        self.optional = np.zeros((len(self.conditions), width), dtype=np.uint8)
+        for row, condition in enumerate(self.conditions):
+            self.required[row] = self.mask(condition['required'], width)
+            self.optional[row] = self.mask(condition['optional'], width)
+        self.required_counts = POPCOUNT[self.required].sum(axis=1, dtype=np.int32)
+        self.optional_counts = POPCOUNT[self.optional].sum(axis=1, dtype=np.int32)
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_conditions(path))
+
+    def __len__(self):
+        return len(self.conditions)
+
+    def mask(self, symptoms, width=None):
+        """Bitmask (uint8 array) of the known symptoms in a list; unknown ones are ignored"""
+        width = self.required.shape[1] if width is None else width
+        mask = np.zeros(width, dtype=np.uint8)
+        for symptom in symptoms:
+            bit = self.bits.get(symptom)
+            if bit is not None:
+                mask[bit // 8] |= np.uint8(1 << (bit % 8))
+        return mask
+
+    def scores(self, symptoms):
+        """(confidence %, matched symptom count) arrays over all conditions"""
+        query = self.mask(symptoms)
+        required_hits = POPCOUNT[self.required & query].sum(axis=1, dtype=np.int32)
+        optional_hits = POPCOUNT[self.optional & query].sum(axis=1, dtype=np.int32)
+
+        required_share = np.divide(required_hits, self.required_counts,
+                                   out=np.zeros(len(self.conditions)), where=self.required_counts > 0)
+        optional_share = np.divide(optional_hits, self.optional_counts,
+                                   out=np.zeros(len(self.conditions)), where=self.optional_counts > 0)
+        confidence = (required_share * REQUIRED_WEIGHT + optional_share * OPTIONAL_WEIGHT) * 100
+        return confidence, required_hits + optional_hits
+
+    def match_percentage(self, row, matched):
+        """Integer % of a condition's symptoms present (the score before required/optional weighting)"""
+        total = int(self.required_counts[row] + self.optional_counts[row])
+        return int(matched / total * 100) if total else 0
+
+    def match(self, symptoms, top_k=5):
+        """
+        [(condition name, {confidence, severity, description, matched_symptoms,
+        match_percentage})], best first
+        """
+        if not self.conditions:
+            return []
+        confidence, matched = self.scores(symptoms)
+
+        candidates = np.flatnonzero(confidence > 0)
+        if len(candidates) > top_k:
+            # Keep the k best (and anything tied with the k-th) before sorting
+            kth = np.partition(confidence[candidates], -top_k)[-top_k]
+            candidates = candidates[confidence[candidates] >= kth]
+        best = candidates[np.argsort(-confidence[candidates], kind='stable')][:top_k]
+
+        results = []
+        for row in best.tolist():
+            condition = self.conditions[row]
+            results.append((condition['name'], {
+                'confidence': round(float(confidence[row]), 1),
+                'severity': condition['severity'],
+                'description': condition['description'],
+                'matched_symptoms': int(matched[row]),
+                'match_percentage': self.match_percentage(row, int(matched[row]))
+            }))
+        return results
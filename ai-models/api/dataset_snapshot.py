@@ -0,0 +1,152 @@
+"""
+MediAI - Startup Dataset Snapshots
+Serializes the fully prepared in-memory structures of an API (DataFrames,
+lookup dicts, interaction store, fuzzy indexes...) into one versioned binary
+file, so a worker restart loads them in one read instead of re-parsing the
+CSV/JSON files and rebuilding every index.
+
+Large flat NumPy arrays in the state (see flat_arrays.py) are not pickled
+inline: they are written as .npy files next to the snapshot and loaded with
+mmap_mode='r', so every API worker shares them from the page cache.
+
+A snapshot is only used when its format version matches SNAPSHOT_VERSION and
+the size/mtime of every source file still matches what it was built from;
+otherwise the API falls back to the raw files.
+
+Build (after any change to the datasets or to the indexed classes):
+    python dataset_snapshot.py              # both APIs
+    python dataset_snapshot.py app_enhanced
+"""
+
+import argparse
+import importlib
+import os
+import pickle
+import shutil
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+MAGIC = b'MEDIAI-SNAPSHOT\n'
+
+# Bump whenever the shape of a snapshot or of a pickled class changes
+SNAPSHOT_VERSION = 10
+
+SNAPSHOT_DIR = Path(__file__).resolve().parent.parent / 'data' / 'snapshots'
+
+
+# 1-D arrays at least this big are memory-mapped instead of pickled
+MMAP_MIN_BYTES = 64 * 1024
+
+
+class ArrayPickler(pickle.Pickler):
+    """Pickler that stores large flat arrays as .npy files in array_dir"""
+
+    def __init__(self, file, array_dir):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.array_dir = array_dir
+        self.count = 0
+
+    def persistent_id(self, obj):
+        if (isinstance(obj, np.ndarray) and obj.ndim == 1 and not obj.dtype.hasobject
+                and obj.nbytes >= MMAP_MIN_BYTES):
+            name = f'{self.count}.npy'
+            self.count += 1
+            np.save(self.array_dir / name, obj, allow_pickle=False)
+            return name
+        return None
+
+
+class ArrayUnpickler(pickle.Unpickler):
+    """Unpickler that memory-maps the arrays stored by ArrayPickler (read-only)"""
+
+    def __init__(self, file, array_dir):
+        super().__init__(file)
+        self.array_dir = array_dir
+
+    def persistent_load(self, pid):
+        return np.load(self.array_dir / pid, mmap_mode='r', allow_pickle=False)
+
+
+def snapshot_path(name):
+    """Snapshot file for an API module ('app' -> data/snapshots/app.snapshot)"""
+    return SNAPSHOT_DIR / f'{name}.snapshot'
+
+
+def fingerprint(sources):
+    """{path: [size, mtime_ns]} for each source file (None if missing)"""
+    result = {}
+    for source in sources:
+        try:
+            stat = os.stat(source)
+            result[str(source)] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            result[str(source)] = None
+    return result
+
+
+def save_snapshot(path, state, sources):
+    """Write state (dict of prepared structures) plus the sources' fingerprint"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # Arrays go to a new directory each time: running workers may still map the old files
+    array_dir = path.parent / f'{path.stem}.arrays-{uuid.uuid4().hex[:12]}'
+    array_dir.mkdir()
+    header = {'version': SNAPSHOT_VERSION, 'sources': fingerprint(sources), 'arrays': array_dir.name}
+
+    # Write next to the target and rename, so workers never read a partial file
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        pickle.dump(header, f, protocol=pickle.HIGHEST_PROTOCOL)
+        ArrayPickler(f, array_dir).dump(state)
+    os.replace(tmp_path, path)
+
+    # Older array directories are no longer referenced (mapped files stay valid until unmapped)
+    for old_dir in path.parent.glob(f'{path.stem}.arrays-*'):
+        if old_dir != array_dir:
+            shutil.rmtree(old_dir, ignore_errors=True)
+    return path
+
+
+def load_snapshot(path, sources):
+    """
+    Prepared state from a snapshot, or None when it is missing, from another
+    format version, built from different source files, or unreadable
+    """
+    path = Path(path)
+    try:
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                print(f"⚠️  Ignoring {path}: not a dataset snapshot")
+                return None
+            header = pickle.load(f)
+            if header.get('version') != SNAPSHOT_VERSION:
+                print(f"⚠️  Ignoring {path}: snapshot version {header.get('version')} != {SNAPSHOT_VERSION}")
+                return None
+            if header.get('sources') != fingerprint(sources):
+                print(f"⚠️  Ignoring {path}: datasets changed since the snapshot was built")
+                return None
+            return ArrayUnpickler(f, path.parent / header['arrays']).load()
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"⚠️  Ignoring {path}: {e}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build startup dataset snapshots for the AI APIs')
+    parser.add_argument('apps', nargs='*', default=['app', 'app_enhanced'], help='API modules to snapshot')
+    args = parser.parse_args()
+
+    for name in args.apps:
+        module = importlib.import_module(name)
+        path = module.save_datasets_snapshot()
+        print(f"✅ Wrote {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+MediAI - Naive-Bayes Differential Diagnosis
+Ranks conditions by posterior probability using the log-likelihood tables
+precomputed by preprocessing/build_diagnosis_model.py. Scoring a request
+adds the evidence rows of the reported symptoms to the condition baseline
+and the age/sex prior, then takes a partial top-k: one pass over a NumPy
+array however many conditions the knowledge base holds.
+
+For a set of reported symptoms S, a condition's score is
+    log P(c | age, sex) + sum over all s of log P(s absent | c)
+                        + sum over s in S of [log P(s | c) - log P(s absent | c)]
+so a request only adds the rows of `evidence` for the reported symptoms to
+`base + log_prior[age band, sex]`.
+"""
+
+import json
+
+import numpy as np
+
+# P(symptom | condition) for required / optional / unrelated symptoms
+REQUIRED_LIKELIHOOD = 0.85
+OPTIONAL_LIKELIHOOD = 0.40
+LEAK_LIKELIHOOD = 0.02
+
+SEXES = ['male', 'female', 'unknown']
+
+
+def build_tables(knowledge_base, symptom_names=()):
+    """
+    Arrays of the diagnosis model (DiagnosisModel keyword arguments) from the
+    parsed condition knowledge base; symptom_names adds symptoms no condition
+    lists (they get the leak likelihood everywhere)
+    """
+    conditions = knowledge_base['conditions']
+    age_bands = list(knowledge_base['age_bands'].items())
+
+    symptoms = sorted(set(symptom_names) | {
+        symptom for condition in conditions for symptom in condition['required'] + condition['optional']
+    })
+    rows = {symptom: i for i, symptom in enumerate(symptoms)}
+
+    # Likelihood of each symptom under each condition
+    likelihood = np.full((len(symptoms), len(conditions)), LEAK_LIKELIHOOD)
+    for column, condition in enumerate(conditions):
+        for symptom in condition['optional']:
+            likelihood[rows[symptom], column] = OPTIONAL_LIKELIHOOD
+        for symptom in condition['required']:
+            likelihood[rows[symptom], column] = REQUIRED_LIKELIHOOD
+
+    evidence = np.log(likelihood) - np.log1p(-likelihood)
+    base = np.log1p(-likelihood).sum(axis=0)
+
+    # Priors: prevalence x age band multiplier x sex multiplier, normalized per (band, sex)
+    prior = np.ones((len(age_bands), len(SEXES), len(conditions)))
+    for column, condition in enumerate(conditions):
+        settings = condition.get('prior', {})
+        prior[:, :, column] *= settings.get('prevalence', 1.0)
+        for band, (name, _) in enumerate(age_bands):
+            prior[band, :, column] *= settings.get('age_bands', {}).get(name, 1.0)
+        for sex, name in enumerate(SEXES):
+            prior[:, sex, column] *= settings.get('sex', {}).get(name, 1.0)
+    log_prior = np.log(prior / prior.sum(axis=2, keepdims=True))
+
+    return {
+        'symptoms': np.array(symptoms),
+        'conditions': np.array([condition['name'] for condition in conditions]),
+        'evidence': evidence.astype(np.float32),
+        'base': base.astype(np.float32),
+        'log_prior': log_prior.astype(np.float32),
+        'age_band_names': np.array([name for name, _ in age_bands]),
+        'age_band_starts': np.array([start for _, start in age_bands], dtype=np.float32),
+        'sexes': np.array(SEXES)
+    }
+
+
+class DiagnosisModel:
+    """Symptom x condition log-likelihood tables plus age band x sex priors"""
+
+    def __init__(self, symptoms, conditions, evidence, base, log_prior, age_band_names,
+                 age_band_starts, sexes):
+        self.symptoms = {str(symptom): row for row, symptom in enumerate(symptoms)}
+        self.conditions = [str(condition) for condition in conditions]
+        self.evidence = evidence              # symptoms x conditions, log P(s|c) - log P(not s|c)
+        self.base = base                      # conditions, sum of log P(not s|c)
+        self.log_prior = log_prior            # age bands x sexes x conditions
+        self.age_band_names = [str(name) for name in age_band_names]
+        self.age_band_starts = age_band_starts
+        self.sexes = {str(sex): i for i, sex in enumerate(sexes)}
+
+    @classmethod
+    def load(cls, path):
+        """Model saved by build_diagnosis_model.py, or None if it has not been built"""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls(**{name: data[name] for name in data.files})
+        except FileNotFoundError:
+            return None
+
+    @classmethod
+    def from_knowledge_base(cls, path, symptom_names=()):
+        """Model compiled straight from a condition knowledge base file (milliseconds)"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**build_tables(json.load(f), symptom_names))
+
+    def __len__(self):
+        return len(self.conditions)
+
+    def prior(self, age=None, gender=None):
+        """Log prior over conditions for a patient (unknown age -> adult band, unknown sex -> 'unknown')"""
+        try:
+            band = int(np.searchsorted(self.age_band_starts, float(age), side='right')) - 1
+        except (TypeError, ValueError):
+            band = self.age_band_names.index('adult') if 'adult' in self.age_band_names else 0
+        sex = self.sexes.get(str(gender).lower(), self.sexes.get('unknown', 0))
+        return self.log_prior[max(band, 0), sex]
+
+    def log_posterior(self, symptoms, age=None, gender=None):
+        """Unnormalized log posterior of every condition (unknown symptoms are ignored)"""
+        rows = sorted({self.symptoms[s] for s in symptoms if s in self.symptoms})
+        return self.prior(age, gender) + self.base + self.evidence[rows].sum(axis=0)
+
+    def rank(self, symptoms, age=None, gender=None, top_k=5, candidates=None):
+        """
+        [(condition, posterior probability)] for the top_k conditions, most
+        probable first; candidates (condition indices) limits which conditions
+        can be returned, probabilities stay normalized over all of them
+        """
+        if not self.conditions:
+            return []
+        scores = self.log_posterior(symptoms, age, gender).astype(np.float64)
+        probabilities = np.exp(scores - scores.max())
+        probabilities /= probabilities.sum()
+
+        if candidates is None:
+            candidates = np.arange(len(self.conditions))
+        top_k = min(top_k, len(candidates))
+        if top_k <= 0:
+            return []
+        best = candidates[np.argpartition(-probabilities[candidates], top_k - 1)[:top_k]]
+        best = best[np.argsort(-probabilities[best], kind='stable')]
+        return [(self.conditions[i], float(probabilities[i])) for i in best.tolist()]
+
+
+def rank_conditions(model, matcher, symptoms, age=None, gender=None, top_k=5):
+    """
+    Possible conditions as [(name, {confidence, severity, description,
+    matched_symptoms, match_percentage})]: ranked by posterior probability
+    when the diagnosis model is built, otherwise by the bitset overlap of
+    the ConditionMatcher.
+    Conditions sharing no symptom with the request are left out either way
+    (before taking the top_k, so up to top_k overlapping ones are returned).
+    """
+    if model is None:
+        return matcher.match(symptoms, top_k=top_k)
+    if not len(matcher):
+        return []
+
+    _, matched = matcher.scores(symptoms)
+    rows = np.array([matcher.rows.get(name, -1) for name in model.conditions], dtype=np.intp)
+    overlapping = np.flatnonzero((rows >= 0) & (matched[rows] > 0))
+
+    results = []
+    for name, probability in model.rank(symptoms, age, gender, top_k=top_k, candidates=overlapping):
+        row = matcher.rows[name]
+        condition = matcher.conditions[row]
+        results.append((name, {
+            'confidence': round(probability * 100, 1),
+            'severity': condition['severity'],
+            'description': condition['description'],
+            'matched_symptoms': int(matched[row]),
+            'match_percentage': matcher.match_percentage(row, int(matched[row]))
+        }))
+    return results
@@ -0,0 +1,385 @@
+"""
+MediAI - Flat Array Dataset Layout
+Read-only copies of the big lookup structures (search index records,
+interaction graph, trigram postings) stored as a handful of NumPy arrays
+instead of millions of Python objects.
+
+Under gunicorn every worker would otherwise hold its own copy: touching a
+Python object updates its reference count, which dirties the page and breaks
+copy-on-write. Flat arrays have no per-item objects, so they stay shared
+after a fork (--preload) and, once saved in a dataset snapshot, are
+memory-mapped from the page cache by every worker (see dataset_snapshot.py).
+"""
+
+import json
+import re
+from difflib import SequenceMatcher
+
+import numpy as np
+
+from fuzzy_index import char_ngrams
+from interaction_store import normalize_drug
+
+SEPARATOR = b'\x00'
+
+MISSING = object()
+
+
+def csr(groups, dtype=np.int32):
+    """(indptr, values) arrays for a list of integer lists"""
+    indptr = np.zeros(len(groups) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(group) for group in groups])
+    values = np.fromiter((value for group in groups for value in group), dtype=dtype, count=indptr[-1])
+    return indptr, values
+
+
+def sorted_keys(strings):
+    """Fixed-width unicode array for np.searchsorted lookups"""
+    width = max((len(s) for s in strings), default=1) or 1
+    return np.array(strings, dtype=f'<U{width}')
+
+
+def key_position(keys, key):
+    """Position of key in a sorted key array, or -1"""
+    position = int(np.searchsorted(keys, key))
+    if position < len(keys) and keys[position] == key:
+        return position
+    return -1
+
+
+class StringTable:
+    """
+    Strings packed into one UTF-8 byte array (each followed by a NUL byte)
+    plus an offsets array; item i is blob[offsets[i]:offsets[i + 1] - 1]
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob          # uint8 array
+        self.offsets = offsets    # int64 array, len(strings) + 1 entries
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [s.encode('utf-8') + SEPARATOR for s in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(blob, offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1] - 1]).decode('utf-8')
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def containing(self, text):
+        """
+        Ascending ids of strings containing text (one regex scan over the
+        blob); every string contains the empty text, as with str.contains('')
+        """
+        needle = text.encode('utf-8')
+        if not needle:
+            return list(range(len(self)))
+        if SEPARATOR in needle:
+            return []
+        pattern = re.compile(re.escape(needle))
+        ids = []
+        position = 0
+        while True:
+            match = pattern.search(self.blob, position)
+            if match is None:
+                return ids
+            i = int(np.searchsorted(self.offsets, match.start(), side='right')) - 1
+            ids.append(i)
+            position = int(self.offsets[i + 1])   # next string
+
+
+class Column:
+    """
+    One field of every record as a typed array: strings, bools, ints,
+    floats (ints mixed in keep their type) or None, so reading a record
+    decodes nothing. Only structured values (lists, dicts, mixed types)
+    fall back to JSON text, decoded once per record and then served from
+    `decoded` - treat those values as read-only.
+    """
+
+    def __init__(self, kind, values, nulls=None, integral=None):
+        self.kind = kind
+        self.values = values      # StringTable, or NumPy array for numeric kinds
+        self.nulls = nulls        # bool array, True where the value is None (or None if there are none)
+        self.integral = integral  # 'number' kind: bool array, True where the value was an int
+        self.decoded = {}         # 'json' kind: position -> decoded value
+
+    @classmethod
+    def from_values(cls, values):
+        present = [value for value in values if value is not None]
+        types = {type(value) for value in present}
+        nulls = np.array([value is None for value in values], dtype=bool) if len(present) < len(values) else None
+        if types <= {str}:
+            return cls('str', StringTable.from_strings(['' if value is None else value for value in values]), nulls)
+        if types == {bool}:
+            return cls('bool', np.array([bool(value) for value in values], dtype=bool), nulls)
+        if types == {int}:
+            return cls('int', np.array([value or 0 for value in values], dtype=np.int64), nulls)
+        if types <= {int, float}:
+            numbers = np.array([0.0 if value is None else value for value in values], dtype=np.float64)
+            integral = np.array([type(value) is int for value in values], dtype=bool)
+            if np.abs(numbers[integral]).max(initial=0) < 2 ** 53:
+                return cls('number', numbers, nulls, integral)
+        return cls('json', StringTable.from_strings([json.dumps(value) for value in values]))
+
+    def __getitem__(self, i):
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        if self.kind == 'str':
+            return self.values[i]
+        if self.kind == 'json':
+            value = self.decoded.get(i, MISSING)
+            if value is MISSING:
+                value = self.decoded[i] = json.loads(self.values[i])
+            return value
+        if self.kind == 'number' and self.integral[i]:
+            return int(self.values[i])
+        return self.values[i].item()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['decoded'] = {}
+        return state
+
+
+class RecordView:
+    """
+    Lazy, read-only list of records selected by position. Not a list: slice
+    it or call tolist() before handing it to jsonify / json.dumps.
+    """
+
+    def __init__(self, index, positions):
+        self.index = index
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.index[position] for position in self.positions[i]]
+        return self.index[self.positions[i]]
+
+    def __iter__(self):
+        return (self.index[position] for position in self.positions)
+
+    def tolist(self):
+        """The selected records as a list of dicts"""
+        return list(self)
+
+
+class FlatSearchIndex:
+    """
+    medicine_search_index.json records stored column-wise. Behaves like the
+    original list of dicts (len, indexing and iteration build a fresh dict
+    from the typed columns),
+    and answers "search_text contains query" with one scan of a byte array.
+    """
+
+    def __init__(self, fields, columns):
+        self.fields = fields      # field names, in record order
+        self.columns = columns    # field -> Column
+
+    @classmethod
+    def from_records(cls, records):
+        fields = list(records[0]) if records else []
+        columns = {field: Column.from_values([record.get(field) for record in records]) for field in fields}
+        return cls(fields, columns)
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]].values) if self.fields else 0
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += len(self)
+        return {field: self.columns[field][position] for field in self.fields}
+
+    def __iter__(self):
+        return (self[position] for position in range(len(self)))
+
+    def containing(self, query, field='search_text'):
+        """Records whose field contains query (lazy view, in index order)"""
+        if field not in self.columns:
+            return RecordView(self, [])
+        return RecordView(self, self.columns[field].values.containing(query))
+
+
+class FlatInteractionStore:
+    """
+    Array version of InteractionStore with the same lookups (get,
+    interacting_pairs, len, in). Drugs are sorted normalized names; the
+    interaction graph is a CSR adjacency list whose edges point at records.
+    """
+
+    def __init__(self, drugs, indptr, partners, edge_records, records, recommendations):
+        self.drugs = drugs                    # sorted normalized generic names
+        self.indptr = indptr                  # drug id -> slice of partners
+        self.partners = partners              # partner drug ids (ascending per drug)
+        self.edge_records = edge_records      # record id per edge
+        self.records = records                # field -> Column (severity, effect, recommendation, source)
+        self.recommendations = recommendations  # record id -> has a recommendation
+
+    @classmethod
+    def from_store(cls, store):
+        names = sorted(store.neighbors)
+        ids = {name: i for i, name in enumerate(names)}
+        keys = list(store.pairs)
+        record_ids = {key: i for i, key in enumerate(keys)}
+
+        adjacency = []
+        edges = []
+        for name in names:
+            partners = sorted(ids[partner] for partner in store.neighbors[name])
+            adjacency.append(partners)
+            edges.append([record_ids[(name, names[p]) if name <= names[p] else (names[p], name)] for p in partners])
+        indptr, partners = csr(adjacency)
+        _, edge_records = csr(edges)
+
+        pairs = [store.pairs[key] for key in keys]
+        records = {
+            field: Column.from_values([pair[field] or '' for pair in pairs])
+            for field in ('severity', 'effect', 'recommendation', 'source')
+        }
+        recommendations = np.array([pair['recommendation'] is not None for pair in pairs], dtype=bool)
+        return cls(sorted_keys(names), indptr, partners, edge_records, records, recommendations)
+
+    def __len__(self):
+        return len(self.recommendations)
+
+    def __contains__(self, pair):
+        return self.get(*pair) is not None
+
+    def record(self, record_id):
+        """Interaction record dict, as stored by InteractionStore"""
+        return {
+            'severity': self.records['severity'][record_id],
+            'effect': self.records['effect'][record_id],
+            'recommendation': self.records['recommendation'][record_id] if self.recommendations[record_id] else None,
+            'source': self.records['source'][record_id]
+        }
+
+    def edge(self, a, b):
+        """Record id of the edge a -> b (drug ids), or -1"""
+        start, end = self.indptr[a], self.indptr[a + 1]
+        partners = self.partners[start:end]
+        position = int(np.searchsorted(partners, b))
+        if position < len(partners) and partners[position] == b:
+            return int(self.edge_records[start + position])
+        return -1
+
+    def get(self, drug1, drug2):
+        """Interaction record for the pair, or None"""
+        a = key_position(self.drugs, normalize_drug(drug1))
+        b = key_position(self.drugs, normalize_drug(drug2))
+        if a < 0 or b < 0:
+            return None
+        record_id = self.edge(a, b)
+        return self.record(record_id) if record_id >= 0 else None
+
+    def interacting_pairs(self, drugs):
+        """
+        Every interacting pair in a regimen as (i, j, record), i < j, in the
+        same order as a nested i/j loop over drugs (see InteractionStore)
+        """
+        positions = {}
+        for index, drug in enumerate(drugs):
+            drug_id = key_position(self.drugs, normalize_drug(drug))
+            if drug_id >= 0:
+                positions.setdefault(drug_id, []).append(index)
+        regimen = np.array(sorted(positions), dtype=self.partners.dtype)
+
+        found = []
+        for drug_id, indexes in positions.items():
+            start, end = self.indptr[drug_id], self.indptr[drug_id + 1]
+            partners = self.partners[start:end]
+            hits = np.flatnonzero(np.isin(partners, regimen))
+            for hit in hits:
+                partner = int(partners[hit])
+                if partner < drug_id:
+                    continue  # each unordered pair is handled from its smaller side
+                record = self.record(int(self.edge_records[start + hit]))
+                for i in indexes:
+                    for j in positions[partner]:
+                        if i < j:
+                            found.append((i, j, record))
+                        elif j < i and partner != drug_id:
+                            found.append((j, i, record))
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
+
+
+class FlatTrigramIndex:
+    """
+    Array version of TrigramIndex (same shortlist/score/search): terms in a
+    StringTable, sorted n-grams with CSR postings, CSR term owners
+    """
+
+    def __init__(self, n, shortlist_size, terms, gram_counts, grams, gram_indptr, postings,
+                 owner_indptr, owners):
+        self.n = n
+        self.shortlist_size = shortlist_size
+        self.terms = terms                  # StringTable, term id -> term text
+        self.gram_counts = gram_counts      # term id -> number of n-grams
+        self.grams = grams                  # sorted n-grams
+        self.gram_indptr = gram_indptr      # gram position -> slice of postings
+        self.postings = postings            # term ids
+        self.owner_indptr = owner_indptr    # term id -> slice of owners
+        self.owners = owners                # record ids
+
+    @classmethod
+    def from_index(cls, index):
+        grams = sorted(index.postings)
+        gram_indptr, postings = csr([index.postings[gram] for gram in grams])
+        owner_indptr, owners = csr(index.owners)
+        return cls(
+            index.n, index.shortlist_size, StringTable.from_strings(index.terms),
+            np.array(index.gram_counts, dtype=np.int32), sorted_keys(grams),
+            gram_indptr, postings, owner_indptr, owners
+        )
+
+    def __len__(self):
+        return len(self.terms)
+
+    def shortlist(self, query):
+        """Term ids sharing the most n-grams with query (best Dice overlap first)"""
+        grams = char_ngrams(query, self.n)
+        found = []
+        for gram in grams:
+            position = key_position(self.grams, gram)
+            if position >= 0:
+                found.append(self.postings[self.gram_indptr[position]:self.gram_indptr[position + 1]])
+        if not found:
+            return []
+
+        term_ids, overlap = np.unique(np.concatenate(found), return_counts=True)
+        scores = overlap / (len(grams) + self.gram_counts[term_ids])
+        best = np.argsort(-scores, kind='stable')[:self.shortlist_size]
+        return term_ids[best].tolist()
+
+    def search(self, query, threshold=0.7):
+        """Return {record_id: best SequenceMatcher ratio} for records scoring >= threshold"""
+        query = query.lower().strip()
+        return self.score(query, self.shortlist(query), threshold)
+
+    def score(self, query, term_ids, threshold=0.7):
+        """Score shortlisted term ids with SequenceMatcher -> {record_id: best ratio >= threshold}"""
+        scores = {}
+
+        for term_id in term_ids:
+            score = SequenceMatcher(None, query, self.terms[term_id]).ratio()
+            if score < threshold:
+                continue
+            for record_id in self.owners[self.owner_indptr[term_id]:self.owner_indptr[term_id + 1]].tolist():
+                if score > scores.get(record_id, 0):
+                    scores[record_id] = score
+
+        return scores
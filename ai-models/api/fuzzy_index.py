@@ -0,0 +1,245 @@
+"""
+MediAI - Fuzzy Lookup Indexes
+Character n-gram inverted index that shortlists candidates before
+SequenceMatcher scoring, so typo tolerance no longer needs a full scan,
+a character-count filtered matcher for term vocabularies (symptom synonyms),
+and a SymSpell-style deletion dictionary for "did you mean" suggestions
+"""
+
+import heapq
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+
+
+def char_ngrams(text, n=3):
+    """Padded character n-grams of text ('dolo' -> ' do', 'dol', 'olo', 'lo ')"""
+    padded = f' {text} '
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from character n-grams to searchable terms.
+
+    Each term (brand, generic, search word...) is stored once and remembers
+    the record ids it came from. A query only scores the few dozen terms
+    sharing the most n-grams with it (Dice overlap) with SequenceMatcher.
+    """
+
+    def __init__(self, n=3, shortlist_size=48):
+        self.n = n
+        self.shortlist_size = shortlist_size
+        self.terms = []                     # term id -> term text
+        self.term_ids = {}                  # term text -> term id
+        self.owners = []                    # term id -> record ids
+        self.gram_counts = []               # term id -> number of n-grams
+        self.postings = defaultdict(list)   # n-gram -> term ids
+
+    def __len__(self):
+        return len(self.terms)
+
+    def add(self, term, record_id):
+        """Register term as a searchable variation of record_id"""
+        term = term.lower().strip()
+        if not term:
+            return
+
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            term_id = len(self.terms)
+            grams = char_ngrams(term, self.n)
+            self.term_ids[term] = term_id
+            self.terms.append(term)
+            self.owners.append([])
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                self.postings[gram].append(term_id)
+
+        owners = self.owners[term_id]
+        if not owners or owners[-1] != record_id:
+            owners.append(record_id)
+
+    def shortlist(self, query):
+        """Term ids sharing the most n-grams with query (best Dice overlap first)"""
+        grams = char_ngrams(query, self.n)
+        overlap = defaultdict(int)
+        for gram in grams:
+            for term_id in self.postings.get(gram, ()):
+                overlap[term_id] += 1
+
+        query_grams = len(grams)
+        return heapq.nlargest(
+            self.shortlist_size,
+            overlap,
+            key=lambda term_id: overlap[term_id] / (query_grams + self.gram_counts[term_id])
+        )
+
+    def search(self, query, threshold=0.7):
+        """Return {record_id: best SequenceMatcher ratio} for records scoring >= threshold"""
+        query = query.lower().strip()
+        return self.score(query, self.shortlist(query), threshold)
+
+    def score(self, query, term_ids, threshold=0.7):
+        """Score shortlisted term ids with SequenceMatcher -> {record_id: best ratio >= threshold}"""
+        scores = {}
+
+        for term_id in term_ids:
+            score = SequenceMatcher(None, query, self.terms[term_id]).ratio()
+            if score < threshold:
+                continue
+            for record_id in self.owners[term_id]:
+                if score > scores.get(record_id, 0):
+                    scores[record_id] = score
+
+        return scores
+
+
+class TermMatcher:
+    """
+    Fuzzy lookup of whole vocabulary terms (e.g. every symptom name and
+    synonym) with the same results as a SequenceMatcher sweep over them.
+
+    A ratio can never exceed 2 * (characters in common) / (total length).
+    Terms are kept sorted by length, so the lengths that can reach the
+    threshold at all (common <= the shorter length) are one contiguous
+    slice found by binary search; the character-count bound is computed for
+    that slice only (one NumPy matrix of counts), and only the few terms
+    passing both are scored with SequenceMatcher.
+    """
+
+    ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789 '
+
+    def __init__(self, terms):
+        self.terms = list(terms)
+        self.columns = {char: i for i, char in enumerate(self.ALPHABET)}
+        # Term positions ordered by length (stable), with counts and lengths in that order
+        self.order = np.argsort([len(term) for term in self.terms], kind='stable').astype(np.int32)
+        self.counts = np.zeros((len(self.terms), len(self.ALPHABET) + 1), dtype=np.int16)
+        for row, position in enumerate(self.order.tolist()):
+            self.counts[row] = self.char_counts(self.terms[position])
+        self.lengths = np.array([len(self.terms[position]) for position in self.order.tolist()], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def char_counts(self, text):
+        """Character count vector (every character outside ALPHABET shares the last column)"""
+        counts = np.zeros(len(self.ALPHABET) + 1, dtype=np.int16)
+        for char in text:
+            counts[self.columns.get(char, len(self.ALPHABET))] += 1
+        return counts
+
+    def length_window(self, length, threshold):
+        """(start, end) rows of the terms whose length allows a ratio >= threshold"""
+        if threshold <= 0:
+            return 0, len(self.terms)
+        # 2 * min(a, b) / (a + b) >= t  <=>  a * t / (2 - t) <= b <= a * (2 - t) / t
+        shortest = length * threshold / (2 - threshold)
+        longest = length * (2 - threshold) / threshold
+        start = int(np.searchsorted(self.lengths, shortest - 1e-9, side='left'))
+        end = int(np.searchsorted(self.lengths, longest + 1e-9, side='right'))
+        return start, end
+
+    def matches(self, query, threshold=0.7):
+        """[(term, SequenceMatcher ratio)] for terms scoring >= threshold, in vocabulary order"""
+        start, end = self.length_window(len(query), threshold)
+        if start >= end:
+            return []
+        common = np.minimum(self.counts[start:end], self.char_counts(query)).sum(axis=1)
+        bound = 2.0 * common / np.maximum(self.lengths[start:end] + len(query), 1)
+        candidates = np.sort(self.order[start:end][bound >= threshold])
+
+        found = []
+        for position in candidates.tolist():
+            term = self.terms[position]
+            score = SequenceMatcher(None, query, term).ratio()
+            if score >= threshold:
+                found.append((term, score))
+        return found
+
+
+def edit_distance(a, b, max_distance):
+    """
+    Optimal string alignment distance (Levenshtein + adjacent transpositions),
+    or max_distance + 1 as soon as the distance is known to exceed max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+
+    return previous[-1]
+
+
+def deletes(word, max_distance):
+    """All strings reachable from word by deleting up to max_distance characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - results
+        results |= frontier
+    return results
+
+
+class SymSpell:
+    """
+    SymSpell-style suggester: every term's prefix is expanded into its
+    deletion neighborhood once at build time, so a query only looks up its
+    own (small) deletion neighborhood instead of comparing with every term.
+    Suggestions are ranked by edit distance, then popularity (term count).
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.counts = {}                    # term -> popularity
+        self.deletes = defaultdict(set)     # deleted prefix -> terms
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, term, count=1):
+        """Add term to the vocabulary (repeated adds increase its popularity)"""
+        term = term.lower().strip()
+        if not term:
+            return
+        if term in self.counts:
+            self.counts[term] += count
+            return
+        self.counts[term] = count
+        for deleted in deletes(term[:self.prefix_length], self.max_distance):
+            self.deletes[deleted].add(term)
+
+    def lookup(self, query, n=5, max_distance=None):
+        """Top-n vocabulary terms within max_distance edits of query"""
+        query = query.lower().strip()
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+
+        candidates = set()
+        for deleted in deletes(query[:self.prefix_length], max_distance):
+            candidates |= self.deletes.get(deleted, set())
+
+        suggestions = []
+        for term in candidates:
+            distance = edit_distance(query, term, max_distance)
+            if distance <= max_distance:
+                suggestions.append((distance, -self.counts[term], term))
+
+        suggestions.sort()
+        return [term for _, _, term in suggestions[:n]]
@@ -0,0 +1,128 @@
+"""
+MediAI - Drug Interaction Store
+Hash index over drug pairs, merged from drug_interactions.csv and the
+Indian medicines database so each pair lookup is a single dict access,
+plus an adjacency list (neighbor set per generic) for whole-regimen checks
+"""
+
+from collections import defaultdict
+
+
+def normalize_drug(name):
+    """Normalize a generic name for pair lookups"""
+    return ' '.join(str(name).lower().split())
+
+
+def pair_key(drug1, drug2):
+    """Unordered, normalized key for a drug pair"""
+    a, b = normalize_drug(drug1), normalize_drug(drug2)
+    return (a, b) if a <= b else (b, a)
+
+
+class InteractionStore:
+    """
+    Known interactions keyed on an unordered, normalized generic pair.
+
+    Records are plain dicts: {'severity', 'effect', 'recommendation', 'source'}.
+    'recommendation' is None for dataset rows (callers derive it from severity).
+    The same pairs are mirrored as an interaction graph in `neighbors`.
+    """
+
+    def __init__(self):
+        self.pairs = {}
+        self.neighbors = defaultdict(set)   # normalized generic -> interacting generics
+        self.checked = set()   # pairs already decided by the primary dataset
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __contains__(self, pair):
+        return pair_key(*pair) in self.pairs
+
+    def add(self, drug1, drug2, severity, effect, recommendation=None, source='dataset'):
+        """Store an interaction unless the pair is already known (first record wins)"""
+        key = pair_key(drug1, drug2)
+        if key in self.pairs:
+            return
+        self.pairs[key] = {
+            'severity': severity,
+            'effect': effect,
+            'recommendation': recommendation,
+            'source': source
+        }
+        a, b = key
+        self.neighbors[a].add(b)
+        self.neighbors[b].add(a)
+
+    def load_dataframe(self, interactions_df):
+        """
+        Load drug_interactions.csv rows. As with the old boolean-mask lookup,
+        only the first row of each pair counts, and has_interaction != 1 means
+        "no interaction" for that pair in this dataset.
+        """
+        rows = zip(
+            interactions_df['drug1'], interactions_df['drug2'],
+            interactions_df['has_interaction'],
+            interactions_df['severity'], interactions_df['effect']
+        )
+        for drug1, drug2, has_interaction, severity, effect in rows:
+            if not isinstance(drug1, str) or not isinstance(drug2, str):
+                continue
+            key = pair_key(drug1, drug2)
+            if key in self.checked:
+                continue
+            self.checked.add(key)
+            if has_interaction == 1:
+                self.add(drug1, drug2, severity, effect, source='dataset')
+
+    def load_records(self, interactions, source='indian_db'):
+        """Load interaction dicts (drug1, drug2, severity, effect, recommendation)"""
+        for interaction in interactions:
+            self.add(
+                interaction['drug1'], interaction['drug2'],
+                interaction['severity'], interaction['effect'],
+                recommendation=interaction.get('recommendation'),
+                source=source
+            )
+
+    @classmethod
+    def from_sources(cls, interactions_df=None, indian_interactions=()):
+        """Build the store; dataset rows take priority over Indian database entries"""
+        store = cls()
+        if interactions_df is not None:
+            store.load_dataframe(interactions_df)
+        store.load_records(indian_interactions)
+        return store
+
+    def get(self, drug1, drug2):
+        """Interaction record for the pair, or None"""
+        return self.pairs.get(pair_key(drug1, drug2))
+
+    def interacting_pairs(self, drugs):
+        """
+        Every interacting pair in a regimen as (i, j, record), i < j, in the
+        same order as a nested i/j loop over drugs.
+
+        Each drug's neighbor set is intersected with the regimen, so the cost
+        grows with the interactions actually present, not with all n^2 pairs.
+        """
+        positions = defaultdict(list)
+        for index, drug in enumerate(drugs):
+            positions[normalize_drug(drug)].append(index)
+        regimen = set(positions)
+
+        found = []
+        for drug, indexes in positions.items():
+            for partner in self.neighbors.get(drug, set()) & regimen:
+                if partner < drug:
+                    continue  # each unordered pair is handled from its smaller side
+                record = self.pairs[(drug, partner)]
+                for i in indexes:
+                    for j in positions[partner]:
+                        if i < j:
+                            found.append((i, j, record))
+                        elif j < i and partner != drug:
+                            found.append((j, i, record))
+
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
@@ -0,0 +1,203 @@
+"""
+MediAI - Precompiled Medicine Matcher
+Exact-name dictionaries, an Aho-Corasick automaton and n-gram substring
+indexes built once at load time, so find_medicine never walks the
+medicine lists or lower-cases fields per request
+"""
+
+import heapq
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton: finds every registered pattern occurring in a
+    text in one left-to-right pass. Patterns are sequences of hashable
+    symbols (characters of a string, or a list of tokens). An optional
+    normalize function is applied to patterns and texts alike (e.g. case or
+    OCR folding); match positions then refer to the normalized text.
+    """
+
+    def __init__(self, normalize=None):
+        self.goto = [{}]       # node -> {symbol: node}
+        self.fail = [0]        # node -> failure link
+        self.output = [[]]     # node -> values of patterns ending here
+        self.normalize = normalize
+        self.built = False
+
+    def add(self, pattern, value):
+        """Register a pattern; value is reported whenever it matches"""
+        if self.normalize is not None:
+            pattern = self.normalize(pattern)
+        node = 0
+        for symbol in pattern:
+            child = self.goto[node].get(symbol)
+            if child is None:
+                child = len(self.goto)
+                self.goto[node][symbol] = child
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            node = child
+        self.output[node].append((len(pattern), value))
+        self.built = False
+
+    def build(self):
+        """Compute failure links (breadth-first) and merge outputs along them"""
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for symbol, child in self.goto[node].items():
+                queue.append(child)
+                link = self.fail[node]
+                while link and symbol not in self.goto[link]:
+                    link = self.fail[link]
+                self.fail[child] = self.goto[link].get(symbol, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+        self.built = True
+
+    def find_all(self, text):
+        """Yield (start, end, value) for every pattern occurrence in text"""
+        if not self.built:
+            self.build()
+        if self.normalize is not None:
+            text = self.normalize(text)
+        node = 0
+        for position, symbol in enumerate(text):
+            while node and symbol not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(symbol, 0)
+            for length, value in self.output[node]:
+                yield position + 1 - length, position + 1, value
+
+
+def ascending(ids):
+    """Yield ids in ascending order lazily (heap), so early exits skip a full sort"""
+    heap = list(ids)
+    heapq.heapify(heap)
+    while heap:
+        yield heapq.heappop(heap)
+
+
+class SubstringIndex:
+    """
+    Finds records whose text contains a query as a substring.
+
+    Every record's texts are split into character n-grams; a query is
+    answered by intersecting the postings of its n-grams (rarest first) and
+    confirming the survivors with a real substring test. Queries shorter
+    than n fall back to a scan of the pre-lowered texts.
+    """
+
+    def __init__(self, n=3):
+        self.n = n
+        self.texts = []        # record id -> tuple of lower-cased texts
+        self.postings = {}     # n-gram -> set of record ids
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, *texts):
+        """Add a record (one or more searchable texts); returns its id"""
+        record_id = len(self.texts)
+        lowered = tuple(text.lower() for text in texts)
+        self.texts.append(lowered)
+        for text in lowered:
+            for i in range(len(text) - self.n + 1):
+                self.postings.setdefault(text[i:i + self.n], set()).add(record_id)
+        return record_id
+
+    def candidates(self, query):
+        """Record ids that may contain query (None means 'all records')"""
+        if len(query) < self.n:
+            return None
+        grams = {query[i:i + self.n] for i in range(len(query) - self.n + 1)}
+        postings = sorted((self.postings.get(gram, set()) for gram in grams), key=len)
+        result = set(postings[0])
+        for posting in postings[1:]:
+            result &= posting
+            if not result:
+                break
+        return result
+
+    def matches(self, query, accept=None):
+        """Ids of records containing query (ascending), optionally filtered by accept(id)"""
+        candidates = self.candidates(query)
+        ids = range(len(self.texts)) if candidates is None else ascending(candidates)
+        for record_id in ids:
+            if accept is not None and not accept(record_id):
+                continue
+            if any(query in text for text in self.texts[record_id]):
+                yield record_id
+
+    def first(self, query, accept=None):
+        """Lowest record id containing query, or None"""
+        return next(self.matches(query, accept), None)
+
+
+class MedicineMatcher:
+    """
+    find_medicine lookups over the Indian medicines list and the international
+    search index, keeping the original priority order:
+      1. exact brand/generic name in Indian medicines
+      2. partial match in Indian medicines (query inside name/generic, or
+         name inside query), skipping combination drugs for single-drug queries
+      3. query inside an international search_text
+    Within each tier the earliest entry of the source list wins.
+    """
+
+    def __init__(self, indian_medicines, search_index):
+        # Tier 1: exact names (first occurrence wins)
+        self.exact = {}
+        for position, med in enumerate(indian_medicines):
+            for key in (med['name'].lower(), med['generic_name'].lower()):
+                if key not in self.exact or self.exact[key] > position:
+                    self.exact[key] = position
+
+        # Tier 2: query inside name/generic, and name inside query
+        self.indian_substrings = SubstringIndex()
+        self.indian_names = AhoCorasick()
+        self.empty_name_positions = []
+        self.combination = []
+        for position, med in enumerate(indian_medicines):
+            name = med['name'].lower()
+            self.indian_substrings.add(name, med['generic_name'])
+            self.combination.append('+' in med['generic_name'])
+            if name:
+                self.indian_names.add(name, position)
+            else:
+                self.empty_name_positions.append(position)
+        self.indian_names.build()
+
+        # Tier 3: international search text
+        self.international = SubstringIndex()
+        for item in search_index:
+            self.international.add(item['search_text'])
+
+    def find_indian_exact(self, search_text):
+        """Position of the first Indian medicine named exactly search_text"""
+        return self.exact.get(search_text)
+
+    def find_indian_partial(self, search_text):
+        """Position of the first Indian medicine partially matching search_text"""
+        if '+' in search_text:
+            accept = None
+        else:
+            accept = lambda position: not self.combination[position]
+
+        best = self.indian_substrings.first(search_text, accept)
+
+        # Brand names contained in the query (one automaton pass over the query)
+        contained = [position for _, _, position in self.indian_names.find_all(search_text)]
+        contained.extend(self.empty_name_positions)
+        for position in contained:
+            if accept is not None and not accept(position):
+                continue
+            if best is None or position < best:
+                best = position
+
+        return best
+
+    def find_international(self, search_text):
+        """Position of the first search index entry whose search_text contains search_text"""
+        return self.international.first(search_text)
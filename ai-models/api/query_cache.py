@@ -0,0 +1,113 @@
+"""
+MediAI - Query Result Cache
+Bounded LRU cache with a per-entry time-to-live for medicine lookups.
+Traffic is dominated by a few dozen names (Dolo 650, Crocin, Pan 40...),
+so normalized queries are resolved once and served from memory afterwards.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Dosages like "500", "200mg", "50 mcg", "10ml" (same pattern find_medicine strips)
+DOSAGE_PATTERN = re.compile(r'\d+\s*(mg|mcg|g|ml|iu|units?)?', re.IGNORECASE)
+
+# Dosages with a unit only ("500mg", "10 ml", "2.5 mg"); bare numbers such as
+# the 650 in "Dolo 650" are part of the brand name for app.py's search
+UNIT_DOSAGE_PATTERN = re.compile(r'\b\d+(?:\.\d+)?\s*(?:mg|mcg|g|ml|iu|units?)\b', re.IGNORECASE)
+
+MISSING = object()
+
+
+def normalize_medicine_query(name):
+    """Cache key for a medicine query: dosage stripped, lower-cased, whitespace collapsed"""
+    return ' '.join(DOSAGE_PATTERN.sub('', name or '').lower().split())
+
+
+def normalize_search_query(query):
+    """
+    Search query with unit dosages stripped, lower-cased, whitespace collapsed
+    ("Paracetamol 500mg" -> "paracetamol"); a query that is only a dosage
+    is kept as typed
+    """
+    stripped = ' '.join(UNIT_DOSAGE_PATTERN.sub(' ', query or '').lower().split())
+    return stripped or ' '.join((query or '').lower().split())
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl` seconds
+    (ttl=None keeps them until evicted). Counts hits, misses, evictions
+    and expirations so the size can be tuned from real traffic.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()   # key -> (expires_at, value), oldest first
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        """Cached value for key (marks it most recently used), or default"""
+        with self.lock:
+            entry = self.entries.get(key, MISSING)
+            if entry is MISSING:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Store value, evicting the least recently used entries beyond maxsize"""
+        if self.maxsize <= 0:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, computing and storing compute() on a miss"""
+        value = self.get(key, MISSING)
+        if value is MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (call whenever the underlying datasets are reloaded)"""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """Counters for monitoring (hit_rate is over all lookups so far)"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
@@ -0,0 +1,161 @@
+"""
+MediAI - Cohort Side Effect Model
+The patient adjustments of /api/predict-side-effects (age, weight, sex,
+chronic conditions, co-medications, contraindications) as multiplier
+tables, evaluated with NumPy broadcasting: one call scores a medicine's
+side effects for a whole cohort as a (patients x side effects) matrix.
+"""
+
+import numpy as np
+
+# Effect-specific base risk categories (Medical Evidence)
+HIGH_RISK_EFFECTS = ['bleeding', 'liver', 'ulcer', 'kidney', 'heart', 'seizure', 'overdose', 'death']
+LOW_RISK_EFFECTS = ['headache', 'nausea', 'dizziness', 'drowsiness', 'fatigue']
+HIGH_RISK_BASE = 0.25
+LOW_RISK_BASE = 0.10
+DEFAULT_BASE = 0.12
+
+# Age bands (whole years): <12, 12-17, 18-65, 66-75, >75
+AGE_EDGES = np.array([12, 18, 66, 76])
+AGE_MULTIPLIERS = np.array([1.8, 1.3, 1.0, 1.4, 1.6])
+
+# Weight bands (kg): <50, 50-100, >100
+WEIGHT_MULTIPLIERS = np.array([1.3, 1.0, 1.2])
+
+# Sex-specific multipliers for side effects containing a keyword
+SEXES = ['other', 'female']
+FEMALE_VALUES = ('female', 'f')
+SEX_EFFECT_MULTIPLIERS = {'female': {'nausea': 1.2}}
+
+# Risk grows by step x count of chronic conditions / co-medications / contraindications
+CONDITION_STEP = 0.15
+MEDICATION_STEP = 0.1
+CONTRAINDICATION_STEP = 0.5
+
+MAX_PROBABILITY = 0.95
+
+
+def effect_base_risk(effects):
+    """Base probability of each side effect from its risk category"""
+    base = np.full(len(effects), DEFAULT_BASE)
+    for i, effect in enumerate(effects):
+        effect_lower = effect.lower()
+        if any(x in effect_lower for x in HIGH_RISK_EFFECTS):
+            base[i] = HIGH_RISK_BASE
+        elif any(x in effect_lower for x in LOW_RISK_EFFECTS):
+            base[i] = LOW_RISK_BASE
+    return base
+
+
+def sex_effect_table(effects):
+    """(sexes x effects) multipliers from SEX_EFFECT_MULTIPLIERS"""
+    table = np.ones((len(SEXES), len(effects)))
+    for sex, keywords in SEX_EFFECT_MULTIPLIERS.items():
+        row = SEXES.index(sex)
+        for i, effect in enumerate(effects):
+            for keyword, multiplier in keywords.items():
+                if keyword in effect.lower():
+                    table[row, i] *= multiplier
+    return table
+
+
+def contraindication_matches(conditions, contraindications):
+    """[(condition, contraindication)] pairs where either name contains the other"""
+    return [
+        (condition, contra)
+        for condition in conditions
+        for contra in contraindications
+        if condition.lower() in contra.lower() or contra.lower() in condition.lower()
+    ]
+
+
+class PatientCohort:
+    """
+    Patient profiles ({age, weight, gender, chronic_conditions,
+    current_medications}) as column arrays. Raises ValueError naming the
+    first profile whose age or weight is not a number, or whose conditions
+    and medications are not lists (of condition names).
+    """
+
+    def __init__(self, profiles):
+        self.profiles = list(profiles)
+        count = len(self.profiles)
+        self.ages = np.empty(count, dtype=np.int64)
+        self.weights = np.empty(count)
+        self.sexes = np.zeros(count, dtype=np.intp)
+        self.condition_counts = np.empty(count)
+        self.medication_counts = np.empty(count)
+        self.conditions = []
+
+        female = SEXES.index('female')
+        for i, profile in enumerate(self.profiles):
+            try:
+                self.ages[i] = int(profile.get('age', 30))
+                self.weights[i] = float(profile.get('weight', 70))
+            except (AttributeError, TypeError, ValueError, OverflowError):
+                raise ValueError(f'Invalid patient profile at index {i}: age and weight must be numbers')
+            if str(profile.get('gender') or '').lower() in FEMALE_VALUES:
+                self.sexes[i] = female
+            conditions = profile.get('chronic_conditions') or []
+            medications = profile.get('current_medications') or []
+            if (not isinstance(conditions, list) or not isinstance(medications, list)
+                    or not all(isinstance(condition, str) for condition in conditions)):
+                raise ValueError(f'Invalid patient profile at index {i}: '
+                                 'chronic_conditions and current_medications must be lists')
+            self.conditions.append(conditions)
+            self.condition_counts[i] = len(conditions)
+            self.medication_counts[i] = len(medications)
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def age_bands(self):
+        return np.searchsorted(AGE_EDGES, self.ages, side='right')
+
+    def weight_bands(self):
+        return (self.weights >= 50).astype(np.intp) + (self.weights > 100)
+
+    def contraindication_counts(self, contraindications):
+        """Contraindication matches per patient (each distinct condition is checked once)"""
+        hits = {}
+        counts = np.zeros(len(self))
+        for i, conditions in enumerate(self.conditions):
+            for condition in conditions:
+                if condition not in hits:
+                    hits[condition] = len(contraindication_matches([condition], contraindications))
+                counts[i] += hits[condition]
+        return counts
+
+
+def predict_probabilities(effects, cohort, contraindications=()):
+    """
+    (patients x effects) side effect probabilities for a cohort, capped at
+    MAX_PROBABILITY, plus the contraindication match count of each patient
+    """
+    contra_counts = cohort.contraindication_counts(contraindications)
+    probabilities = (effect_base_risk(effects)[np.newaxis, :]
+                     * AGE_MULTIPLIERS[cohort.age_bands()][:, np.newaxis])
+    probabilities *= WEIGHT_MULTIPLIERS[cohort.weight_bands()][:, np.newaxis]
+    probabilities *= sex_effect_table(effects)[cohort.sexes]
+    probabilities *= (1 + cohort.condition_counts * CONDITION_STEP)[:, np.newaxis]
+    probabilities *= (1 + cohort.medication_counts * MEDICATION_STEP)[:, np.newaxis]
+    probabilities *= (1 + contra_counts * CONTRAINDICATION_STEP)[:, np.newaxis]
+    return np.minimum(probabilities, MAX_PROBABILITY), contra_counts
+
+
+def percentages(probabilities):
+    """
+    Probabilities as percentages rounded to one decimal (np.round, half to
+    even - the single-patient endpoint uses the same function), plus each
+    row's average
+    """
+    rounded = np.round(probabilities * 100, 1)
+    average = rounded.mean(axis=1) if rounded.shape[1] else np.zeros(len(rounded))
+    return rounded, average
+
+
+def overall_risk_levels(average_percentages):
+    """'high' / 'moderate' / 'low' for average side effect probabilities (%)"""
+    return np.select(
+        [average_percentages > 40, average_percentages > 20], ['high', 'moderate'], 'low'
+    )
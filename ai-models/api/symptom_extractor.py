@@ -0,0 +1,113 @@
+"""
+MediAI - Free-Text Symptom Extraction
+Every symptom name, synonym and severity indicator of the symptom database
+(see preprocessing/build_symptom_search_index.py) compiled into one
+token-level Aho-Corasick automaton, so a sentence like "throwing up since
+yesterday with high temp and body ache" is resolved to canonical symptoms,
+severity phrases and emergency flags in a single pass over its words.
+"""
+
+import re
+
+from medicine_matcher import AhoCorasick
+
+# Words, keeping contractions together ("can't" -> "cant", as in the synonyms)
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)*")
+
+
+def tokenize(text):
+    """[(token, start, end)] of the lower-cased words of text (character offsets)"""
+    return [(match.group().replace("'", ''), match.start(), match.end())
+            for match in TOKEN_PATTERN.finditer(text.lower())]
+
+
+class SymptomExtractor:
+    """
+    Finds symptom phrases in free text. Symptom mentions are resolved
+    leftmost-longest without overlaps ("chest pain" is not also "pain").
+    Severity indicators are reported unless part of a longer phrase;
+    multi-word ones that belong to a single symptom ("bluish lips") also count
+    as a mention of it. Single words ("pain", "blood") and phrases several
+    symptoms share ("severe pain", "radiating pain") are too ambiguous to.
+    """
+
+    def __init__(self, symptom_database):
+        self.symptom_database = symptom_database
+        self.automaton = AhoCorasick()
+        self.indicator_symptoms = {}   # severity phrase -> canonical symptoms listing it
+        for canonical, data in symptom_database.items():
+            phrases = [data['medical_name'], canonical.replace('_', ' '), *data.get('synonyms', [])]
+            for phrase in phrases:
+                self.add(phrase, ('symptom', canonical, phrase.lower()))
+            for phrase in data.get('severity_indicators', []):
+                self.add(phrase, ('severity', canonical, phrase.lower()))
+                self.indicator_symptoms.setdefault(phrase.lower(), set()).add(canonical)
+        self.automaton.build()
+
+    def add(self, phrase, value):
+        tokens = tuple(token for token, _, _ in tokenize(phrase))
+        if tokens:
+            self.automaton.add(tokens, value)
+
+    def extract(self, text):
+        """
+        {'symptoms', 'severity_indicators', 'emergency', 'emergency_symptoms'}
+        for the phrases found in text, in text order
+        """
+        tokens = tokenize(text)
+        symptom_hits = []
+        severity_hits = []
+        for start, end, value in self.automaton.find_all([token for token, _, _ in tokens]):
+            (severity_hits if value[0] == 'severity' else symptom_hits).append((start, end, value))
+
+        # Leftmost-longest symptom mentions, without overlaps
+        symptom_hits.sort(key=lambda hit: (hit[0], -(hit[1] - hit[0])))
+        mentions = []
+        covered_until = 0
+        for start, end, value in symptom_hits:
+            if start >= covered_until:
+                mentions.append((start, end, value))
+                covered_until = end
+
+        # Severity phrases inside a longer phrase ("blood" in "blood in cough") are not separate hits
+        hits = symptom_hits + severity_hits
+        severity_hits = [
+            (start, end, value) for start, end, value in severity_hits
+            if not any(s <= start and end <= e and e - s > end - start for s, e, _ in hits)
+        ]
+
+        def span(start, end):
+            return text[tokens[start][1]:tokens[end - 1][2]]
+
+        severity_indicators = [{
+            'phrase': phrase,
+            'canonical': canonical,
+            'matched_text': span(start, end)
+        } for start, end, (_, canonical, phrase) in sorted(severity_hits)]
+
+        symptoms = []
+        seen = set()
+        implied = [hit for hit in severity_hits
+                   if hit[1] - hit[0] > 1 and len(self.indicator_symptoms[hit[2][2]]) == 1]
+        for start, end, (_, canonical, _) in sorted(mentions + implied):
+            if canonical in seen:
+                continue
+            seen.add(canonical)
+            data = self.symptom_database[canonical]
+            symptoms.append({
+                'canonical': canonical,
+                'medical_name': data['medical_name'],
+                'category': data['category'],
+                'matched_text': span(start, end),
+                'start': tokens[start][1],
+                'end': tokens[end - 1][2],
+                'is_emergency': data.get('emergency', False)
+            })
+
+        emergency_symptoms = [symptom['medical_name'] for symptom in symptoms if symptom['is_emergency']]
+        return {
+            'symptoms': symptoms,
+            'severity_indicators': severity_indicators,
+            'emergency': bool(emergency_symptoms),
+            'emergency_symptoms': emergency_symptoms
+        }
@@ -0,0 +1,51 @@
+"""
+MediAI - TF-IDF Name Similarity Engine
+Character n-gram TF-IDF vectors for every searchable name (brands, generics,
+international synonyms), kept as one sparse matrix. A query, or a whole batch
+of queries, is scored against every name with a single sparse matrix product.
+"""
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+class TfidfNameSearch:
+    """
+    Cosine similarity over char n-gram TF-IDF vectors.
+
+    Term ids are positions in the `terms` list given at build time, so the
+    engine can share ids with a TrigramIndex built over the same terms.
+    """
+
+    def __init__(self, terms, ngram_range=(2, 4), shortlist_size=48, batch_size=256):
+        self.shortlist_size = shortlist_size
+        self.batch_size = batch_size
+        self.vectorizer = TfidfVectorizer(
+            analyzer='char_wb', ngram_range=ngram_range, lowercase=True, dtype=np.float32
+        )
+        self.matrix = self.vectorizer.fit_transform(terms).T.tocsr()   # features x terms
+
+    def __len__(self):
+        return self.matrix.shape[1]
+
+    def similarities(self, queries):
+        """Dense (len(queries) x terms) cosine similarity matrix"""
+        vectors = self.vectorizer.transform([query.lower().strip() for query in queries])
+        return (vectors @ self.matrix).toarray()
+
+    def shortlist(self, queries):
+        """Best-scoring term ids per query (best first), one matrix product per batch"""
+        shortlists = []
+        k = min(self.shortlist_size, len(self))
+        if k == 0:
+            return [[] for _ in queries]
+
+        for start in range(0, len(queries), self.batch_size):
+            scores = self.similarities(queries[start:start + self.batch_size])
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            for row, candidates in enumerate(top):
+                candidates = candidates[scores[row, candidates] > 0]
+                order = np.argsort(-scores[row, candidates], kind='stable')
+                shortlists.append(candidates[order].tolist())
+
+        return shortlists
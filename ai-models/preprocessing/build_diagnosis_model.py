@@ -0,0 +1,54 @@
+"""
+Build Naive-Bayes Differential Diagnosis Model
+Precomputes the symptom x condition log-likelihood tables and the
+age band x sex condition priors used by /api/analyze-symptoms, from the
+condition knowledge base (ai-models/knowledge_base/conditions.json) and the
+symptom vocabulary of build_symptom_search_index.py. The tables are
+computed by ai-models/api/diagnosis_engine.py (the APIs compile the same
+tables at startup when this file has not been built).
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from build_symptom_search_index import SYMPTOM_DATABASE
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+from diagnosis_engine import build_tables
+
+KNOWLEDGE_BASE = Path(__file__).parent.parent / 'knowledge_base' / 'conditions.json'
+OUTPUT_FILE = Path(__file__).parent.parent / 'data' / 'processed' / 'diagnosis_model.npz'
+
+
+def build_model(knowledge_base):
+    """Arrays of the diagnosis model from the parsed knowledge base"""
+    return build_tables(knowledge_base, SYMPTOM_DATABASE)
+
+
+def main():
+    print("\n🧮 Building Differential Diagnosis Model...")
+    print("=" * 60)
+
+    with open(KNOWLEDGE_BASE, 'r', encoding='utf-8') as f:
+        knowledge_base = json.load(f)
+
+    model = build_model(knowledge_base)
+
+    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(OUTPUT_FILE, **model)
+
+    print(f"\n✅ Diagnosis model created successfully!")
+    print(f"📍 Location: {OUTPUT_FILE}")
+    print(f"📊 Conditions: {len(model['conditions'])}")
+    print(f"🔍 Symptoms: {len(model['symptoms'])}")
+    print(f"👥 Prior groups: {len(model['age_band_names'])} age bands x {len(model['sexes'])} sexes")
+
+    print("\n" + "=" * 60)
+    print("✅ Model ready for AI symptom analysis!")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""
+Tests for the bitset condition matcher (ai-models/api/condition_matcher.py)
+Run from ai-models/: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'api'))
+
+from condition_matcher import ConditionMatcher
+
+
+def condition(name, required, optional=()):
+    return {'name': name, 'required': list(required), 'optional': list(optional),
+            'severity': 'mild', 'description': name}
+
+
+def list_confidence(record, symptoms):
+    """The list-based 70/30 formula the bitset scoring replaces"""
+    required = sum(1 for s in record['required'] if s in symptoms) / len(record['required']) if record['required'] else 0
+    optional = sum(1 for s in record['optional'] if s in symptoms) / len(record['optional']) if record['optional'] else 0
+    return round((required * 0.7 + optional * 0.3) * 100, 1)
+
+
+def test_scores_match_the_list_formula_on_the_knowledge_base():
+    matcher = ConditionMatcher.from_file(ROOT / 'knowledge_base' / 'conditions.json')
+    symptoms = ['fever', 'cough', 'headache', 'fatigue']
+    results = matcher.match(symptoms, top_k=len(matcher))
+    assert results
+    for name, result in results:
+        record = matcher.conditions[matcher.rows[name]]
+        assert result['confidence'] == list_confidence(record, symptoms)
+    confidences = [result['confidence'] for _, result in results]
+    assert confidences == sorted(confidences, reverse=True)
+
+
+def test_match_percentage_is_the_integer_share_of_all_symptoms():
+    matcher = ConditionMatcher([condition('Cold', ['cough', 'runny_nose'], ['fever', 'fatigue', 'headache'])])
+    (name, result), = matcher.match(['cough', 'fever'])
+    assert result['matched_symptoms'] == 2
+    assert result['match_percentage'] == 40
+    assert result['confidence'] == 45.0
+
+
+def test_ties_keep_knowledge_base_order_across_byte_boundaries():
+    # More than 8 symptoms, so the masks span several bytes
+    conditions = [condition(f'C{i}', [f's{i}', 'shared']) for i in range(12)]
+    matcher = ConditionMatcher(conditions)
+    assert [name for name, _ in matcher.match(['shared'], top_k=12)] == [f'C{i}' for i in range(12)]
+
+
+def test_top_k_keeps_the_best_and_ties_at_the_cut():
+    conditions = [condition('Weak', ['a', 'b', 'c', 'd']), condition('TiedFirst', ['a', 'b']),
+                  condition('Best', ['a']), condition('TiedSecond', ['a', 'c'])]
+    matcher = ConditionMatcher(conditions)
+    assert [name for name, _ in matcher.match(['a'], top_k=2)] == ['Best', 'TiedFirst']
+    assert [name for name, _ in matcher.match(['a'], top_k=3)] == ['Best', 'TiedFirst', 'TiedSecond']
+    assert [name for name, _ in matcher.match(['a'], top_k=10)] == ['Best', 'TiedFirst', 'TiedSecond', 'Weak']
+
+
+def test_unknown_symptoms_are_ignored():
+    matcher = ConditionMatcher([condition('Cold', ['cough'])])
+    assert matcher.match(['not_a_symptom']) == []
+    assert [name for name, _ in matcher.match(['cough', 'not_a_symptom'])] == ['Cold']
+    assert ConditionMatcher([]).match(['cough']) == []
@@ -0,0 +1,48 @@
+"""
+Tests for the Naive-Bayes condition ranking (ai-models/api/diagnosis_engine.py)
+Run from ai-models/: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'api'))
+sys.path.insert(0, str(ROOT / 'preprocessing'))
+
+from build_symptom_search_index import SYMPTOM_DATABASE
+from condition_matcher import ConditionMatcher
+from diagnosis_engine import DiagnosisModel, rank_conditions
+
+CONDITIONS_FILE = ROOT / 'knowledge_base' / 'conditions.json'
+
+
+def knowledge_base():
+    model = DiagnosisModel.from_knowledge_base(CONDITIONS_FILE, SYMPTOM_DATABASE)
+    return model, ConditionMatcher.from_file(CONDITIONS_FILE)
+
+
+def test_fever_and_cough_rank_respiratory_infections_first():
+    model, matcher = knowledge_base()
+    results = rank_conditions(model, matcher, ['fever', 'cough'], age=30, gender='female', top_k=3)
+    assert {name for name, _ in results[:2]} == {'COVID-19', 'Common Cold'}
+    confidences = [result['confidence'] for _, result in results]
+    assert confidences == sorted(confidences, reverse=True)
+
+
+def test_only_overlapping_conditions_are_returned():
+    model, matcher = knowledge_base()
+    results = rank_conditions(model, matcher, ['fever', 'cough'], top_k=len(matcher))
+    assert results
+    assert all(result['matched_symptoms'] > 0 for _, result in results)
+
+
+def test_without_a_model_ranking_falls_back_to_symptom_overlap():
+    _, matcher = knowledge_base()
+    symptoms = ['fever', 'cough']
+    assert rank_conditions(None, matcher, symptoms, top_k=3) == matcher.match(symptoms, top_k=3)
+
+
+def test_unknown_symptoms_match_nothing():
+    model, matcher = knowledge_base()
+    assert rank_conditions(model, matcher, ['not_a_symptom'], top_k=3) == []
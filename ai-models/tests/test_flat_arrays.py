@@ -0,0 +1,62 @@
+"""
+Tests for the flat array dataset layout (ai-models/api/flat_arrays.py)
+Run from ai-models/: python -m pytest tests
+"""
+
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'api'))
+
+from flat_arrays import FlatSearchIndex, StringTable
+
+RECORDS = [
+    {'display_name': 'Crocin', 'generic_name': 'paracetamol', 'search_text': 'crocin paracetamol'},
+    {'display_name': 'Aspirin', 'generic_name': 'aspirin', 'search_text': 'aspirin'},
+    {'display_name': 'Dolo 650', 'generic_name': 'paracetamol', 'search_text': 'dolo 650 paracetamol'},
+]
+
+
+def test_containing_matches_substrings_in_order():
+    table = StringTable.from_strings(['crocin paracetamol', 'aspirin', 'dolo 650 paracetamol'])
+    assert table.containing('paracetamol') == [0, 2]
+    assert table.containing('asp') == [1]
+    assert table.containing('ibuprofen') == []
+
+
+def test_containing_empty_text_returns_every_id():
+    table = StringTable.from_strings(['crocin', 'aspirin', 'dolo'])
+    assert table.containing('') == [0, 1, 2]
+    assert StringTable.from_strings([]).containing('') == []
+
+
+def test_search_index_empty_query_returns_every_record():
+    index = FlatSearchIndex.from_records(RECORDS)
+    assert [record['display_name'] for record in index.containing('')] == ['Crocin', 'Aspirin', 'Dolo 650']
+
+
+def test_record_view_materializes_to_json_serializable_dicts():
+    view = FlatSearchIndex.from_records(RECORDS).containing('paracetamol')
+    assert len(view) == 2
+    assert view[0] == RECORDS[0]
+    assert view[:5] == [RECORDS[0], RECORDS[2]]
+    assert json.loads(json.dumps(view.tolist())) == [RECORDS[0], RECORDS[2]]
+
+
+def test_typed_columns_round_trip_nulls_and_mixed_numbers():
+    records = [
+        {'name': 'Crocin', 'price': 30, 'pack_size': None, 'is_discontinued': False, 'tags': ['fever']},
+        {'name': 'Dolo 650', 'price': 31.5, 'pack_size': '15 tablets', 'is_discontinued': None, 'tags': []},
+    ]
+    index = FlatSearchIndex.from_records(records)
+    assert [index[0], index[1]] == records
+    assert type(index[0]['price']) is int and type(index[1]['price']) is float
+    assert index.columns['price'].kind == 'number'
+    assert index.columns['pack_size'].kind == 'str'
+
+
+def test_json_column_is_decoded_once_per_record():
+    index = FlatSearchIndex.from_records([{'name': 'Crocin', 'tags': ['fever', 'pain']}])
+    assert index.columns['tags'].kind == 'json'
+    assert index[0]['tags'] is index[0]['tags']
@@ -0,0 +1,107 @@
+"""
+Tests for the cohort side effect model (ai-models/api/side_effect_model.py)
+and the /api/predict-side-effects endpoints of app_enhanced.py
+Run from ai-models/: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'api'))
+
+from side_effect_model import PatientCohort, percentages, predict_probabilities
+
+EFFECTS = ['Nausea', 'Headache', 'Liver damage', 'Rash']
+CONTRAINDICATIONS = ['Liver disease']
+PATIENTS = [
+    {'age': 8, 'weight': 25, 'gender': 'female'},
+    {'age': 30, 'weight': 70, 'gender': 'male', 'current_medications': ['Metformin']},
+    {'age': 70, 'weight': 110, 'gender': 'F', 'chronic_conditions': ['Liver disease', 'Diabetes']},
+    {'age': 90, 'weight': 45, 'chronic_conditions': ['Asthma'], 'current_medications': ['A', 'B', 'C']},
+    {}
+]
+MEDICINE = {
+    'found': True,
+    'name': 'Testamol',
+    'generic_name': 'Testamol',
+    'category': 'Analgesic',
+    'side_effects': EFFECTS,
+    'contraindications': CONTRAINDICATIONS
+}
+
+
+def test_cohort_rows_equal_single_patient_predictions():
+    probabilities, contra_counts = predict_probabilities(EFFECTS, PatientCohort(PATIENTS), CONTRAINDICATIONS)
+    rounded, average = percentages(probabilities)
+    for i, patient in enumerate(PATIENTS):
+        single, single_counts = predict_probabilities(EFFECTS, PatientCohort([patient]), CONTRAINDICATIONS)
+        single_rounded, single_average = percentages(single)
+        assert np.array_equal(probabilities[i], single[0])
+        assert np.array_equal(rounded[i], single_rounded[0])
+        assert average[i] == single_average[0]
+        assert contra_counts[i] == single_counts[0]
+
+
+def test_percentages_round_to_one_decimal_and_average_rows():
+    rounded, average = percentages(np.array([[0.12345, 0.5], [0.95, 0.0]]))
+    assert rounded.tolist() == [[12.3, 50.0], [95.0, 0.0]]
+    assert average.tolist() == [31.15, 47.5]
+    assert percentages(np.zeros((2, 0)))[1].tolist() == [0.0, 0.0]
+
+
+@pytest.mark.parametrize('profile', [
+    {'age': 1e30},
+    {'age': 'old'},
+    {'weight': None},
+    {'chronic_conditions': 5},
+    {'chronic_conditions': [1]},
+    {'current_medications': 'Metformin'},
+    'not a profile'
+])
+def test_bad_profiles_raise_value_error(profile):
+    with pytest.raises(ValueError):
+        PatientCohort([{}, profile])
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app_enhanced = pytest.importorskip('app_enhanced')
+    monkeypatch.setattr(app_enhanced, 'resolve_medicine', lambda name: (True, MEDICINE))
+    return app_enhanced.app.test_client()
+
+
+def test_batch_endpoint_matches_single_endpoint(client):
+    batch = client.post('/api/predict-side-effects/batch', json={'medicines': ['Testamol'], 'patients': PATIENTS})
+    assert batch.status_code == 200
+    result = batch.get_json()['results'][0]
+    for i, patient in enumerate(PATIENTS):
+        single = client.post('/api/predict-side-effects', json={'medicine': 'Testamol', **patient})
+        assert single.status_code == 200
+        single = single.get_json()
+        by_effect = {item['side_effect']: item['probability'] for item in single['predicted_side_effects']}
+        assert [by_effect[effect] for effect in result['side_effects']] == result['probabilities'][i]
+        assert result['average_probability'][i] == single['average_probability']
+        assert result['overall_risk'][i] == single['overall_risk']
+        assert result['contraindication_risk'][i] == single['contraindication_risk']
+
+
+@pytest.mark.parametrize('body', [
+    {'medicines': ['Testamol'], 'patients': [{'age': 1e30}]},
+    {'medicines': ['Testamol'], 'patients': [{'chronic_conditions': 5}]},
+    {'medicines': ['Testamol'], 'patients': ['not a profile']},
+    {'medicines': 5, 'patients': [{}]},
+    {'medicines': ['Testamol'], 'patients': []}
+])
+def test_batch_endpoint_rejects_bad_input(client, body):
+    response = client.post('/api/predict-side-effects/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_single_endpoint_rejects_bad_profile(client):
+    response = client.post('/api/predict-side-effects', json={'medicine': 'Testamol', 'age': 1e30})
+    assert response.status_code == 400
@@ -0,0 +1,47 @@
+"""
+Tests for free-text symptom extraction (ai-models/api/symptom_extractor.py)
+Run from ai-models/: python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'api'))
+sys.path.insert(0, str(ROOT / 'preprocessing'))
+
+from build_symptom_search_index import SYMPTOM_DATABASE
+from symptom_extractor import SymptomExtractor
+
+extractor = SymptomExtractor(SYMPTOM_DATABASE)
+
+
+def canonicals(text):
+    return [symptom['canonical'] for symptom in extractor.extract(text)['symptoms']]
+
+
+def test_synonyms_resolve_to_canonical_symptoms_in_text_order():
+    assert canonicals('throwing up since yesterday with high temp and body ache') == [
+        'vomiting', 'fever', 'muscle_ache'
+    ]
+
+
+def test_longest_phrase_wins():
+    result = extractor.extract('severe chest pain since morning')
+    assert [symptom['canonical'] for symptom in result['symptoms']] == ['chest_pain']
+    assert result['emergency'] is True
+
+
+def test_shared_severity_indicator_implies_no_symptom():
+    result = extractor.extract('I have severe pain in my knee')
+    assert result['symptoms'] == []
+    assert result['emergency'] is False
+    assert {indicator['phrase'] for indicator in result['severity_indicators']} == {'severe pain'}
+
+    result = extractor.extract('radiating pain down my arm')
+    assert result['symptoms'] == []
+    assert result['emergency'] is False
+
+
+def test_indicator_of_a_single_symptom_implies_it():
+    assert canonicals('she has bluish lips') == ['shortness_of_breath']
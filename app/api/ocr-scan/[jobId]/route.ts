@@ -0,0 +1,28 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { getServerSession } from 'next-auth';
+import { authOptions } from '@/lib/auth.config';
+import { fetchOcrJob, followOcrJob, toScanResponse } from '@/lib/ocrScan';
+
+/**
+ * GET /api/ocr-scan/[jobId]
+ * Result of a scan that outlived POST /api/ocr-scan (202 + job_id):
+ * polls the Flask job, 202 again while it is still running
+ */
+export async function GET(
+  req: NextRequest,
+  { params }: { params: { jobId: string } }
+) {
+  try {
+    const session = await getServerSession(authOptions);
+
+    if (!session || !session.user) {
+      return NextResponse.json({ message: 'Unauthorized' }, { status: 401 });
+    }
+
+    return await toScanResponse(await followOcrJob(await fetchOcrJob(params.jobId)));
+
+  } catch (error) {
+    console.error('Error polling OCR job:', error);
+    return NextResponse.json({ message: 'Internal server error' }, { status: 500 });
+  }
+}
@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { getServerSession } from 'next-auth';
 import { authOptions } from '@/lib/auth.config';
+import { followOcrJob, submitOcrScan, toScanResponse } from '@/lib/ocrScan';
 
 // POST - Scan medicine image using OCR
 export async function POST(req: NextRequest) {
@@ -18,40 +19,15 @@ export async function POST(req: NextRequest) {
       return NextResponse.json({ message: 'Image is required' }, { status: 400 });
     }
 
-    // Convert image to base64 for sending to Flask backend
-    const bytes = await image.arrayBuffer();
-    const buffer = Buffer.from(bytes);
-    const base64Image = buffer.toString('base64');
-
-    // Call Flask backend
-    const flaskUrl = 'http://localhost:8000/ocr-scan';
-    
-    const flaskResponse = await fetch(flaskUrl, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify({
-        image: base64Image,
-        filename: image.name
-      }),
-      signal: AbortSignal.timeout(15000)
-    });
-
-    if (flaskResponse.ok) {
-      const data = await flaskResponse.json();
-      return NextResponse.json({
-        medicine_name: data.medicine_name,
-        confidence: data.confidence || 0,
-        extracted_text: data.extracted_text || ''
-      });
-    } else {
-      const errorData = await flaskResponse.json();
-      return NextResponse.json({ 
-        message: errorData.message || errorData.error || 'Could not identify medicine',
-        extracted_text: errorData.extracted_text || ''
-      }, { status: 400 });
-    }
+    // Forward the file as a binary multipart upload (no base64 inflation)
+    const flaskForm = new FormData();
+    flaskForm.append('image', image, image.name);
+
+    // Queue the scan on Flask (answered at once: 202 + job, 429 or an upload error)
+    const flaskResponse = await submitOcrScan(flaskForm);
+
+    // Poll the job, then hand the job id back (202) if it outlives the budget
+    return await toScanResponse(await followOcrJob(flaskResponse));
 
   } catch (error) {
     console.error('Error processing image:', error);
@@ -49,11 +49,17 @@ export default function MedicineScanner({ onMedicineExtracted }: MedicineScanner
       const formData = new FormData();
       formData.append('image', selectedImage);
 
-      const res = await fetch('/api/ocr-scan', {
+      let res = await fetch('/api/ocr-scan', {
         method: 'POST',
         body: formData
       });
 
+      // A slow scan comes back as 202 + poll_url: keep polling until it finishes
+      while (res.status === 202) {
+        const job = await res.json();
+        res = await fetch(job.poll_url);
+      }
+
       if (res.ok) {
         const data = await res.json();
         setExtractedMedicine(data.medicine_name);
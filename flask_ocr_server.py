@@ -5,11 +5,35 @@ Run this with: python flask_ocr_server.py
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.formparser import FormDataParser
 import base64
 import io
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageEnhance, ImageFilter, ImageOps, UnidentifiedImageError
 import re
 import os
+import sys
+import tempfile
+import json
+import math
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Shared matching code of the AI API (ai-models/api)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai-models', 'api'))
+from medicine_matcher import AhoCorasick
+
+# NumPy is needed for the perceptual-hash result cache
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
 
 # Try to import OpenCV for advanced preprocessing
 try:
@@ -24,6 +48,105 @@ except ImportError:
 app = Flask(__name__)
 CORS(app)  # Allow requests from Next.js frontend
 
+# Largest accepted image (multipart or raw body, or decoded from base64 JSON)
+MAX_UPLOAD_BYTES = int(float(os.environ.get('OCR_MAX_UPLOAD_MB', 20)) * 1024 * 1024)
+# Base64 JSON bodies carry 4/3 of the image size, plus room for the JSON / data URL wrapper
+MAX_JSON_BODY_BYTES = MAX_UPLOAD_BYTES * 4 // 3 + 64 * 1024
+# Multipart bodies carry the image plus boundaries and part headers
+MAX_MULTIPART_BODY_BYTES = MAX_UPLOAD_BYTES + 64 * 1024
+app.config['MAX_CONTENT_LENGTH'] = MAX_JSON_BODY_BYTES
+# Binary bodies are read in chunks of this size; up to UPLOAD_SPOOL_BYTES stay in memory
+UPLOAD_CHUNK_BYTES = 64 * 1024
+UPLOAD_SPOOL_BYTES = 1024 * 1024
+
+# OCR variants: every rotation is read with every page segmentation mode (PSM)
+ROTATION_ANGLES = [0, -5, 5, -10, 10]  # Try slight rotations (0° first)
+PSM_MODES = [6, 11, 7, 8]  # Uniform block, sparse text, single line, single word
+
+# Single-pass OCR: one image_to_data run (sparse text) per image, from whose word
+# boxes the block/line/word views are rebuilt; a second run (uniform block) only
+# when the mean word confidence is below OCR_MIN_CONFIDENCE.
+# OCR_SINGLE_PASS=0 runs every PSM_MODES variant instead
+OCR_SINGLE_PASS = os.environ.get('OCR_SINGLE_PASS', '1') != '0'
+DATA_PSM = 11
+SECOND_PASS_PSM = 6
+OCR_MIN_CONFIDENCE = float(os.environ.get('OCR_MIN_CONFIDENCE', 60))
+
+# Ingest: largest side decoded, and the character height text is scaled down to
+MAX_IMAGE_SIDE = int(os.environ.get('OCR_MAX_IMAGE_SIDE', 2400))
+TARGET_TEXT_HEIGHT = int(os.environ.get('OCR_TARGET_TEXT_HEIGHT', 32))
+
+# Text regions OCR'd before falling back to the whole frame (OpenCV)
+MAX_TEXT_REGIONS = 3
+
+# Skew estimation (OpenCV): largest side analysed, largest correction applied
+SKEW_ANALYSIS_SIZE = 1000
+MAX_SKEW = 45
+
+# Process pool for running variants concurrently (OCR_WORKERS=1 scans serially).
+# It is created from a request/queue thread, so workers are started from a
+# forkserver (spawn where unavailable) rather than forked from this
+# multithreaded process, which could deadlock on inherited locks
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', os.cpu_count() or 1))
+OCR_POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+ocr_pool = None
+ocr_pool_lock = threading.Lock()
+
+# Job queue: every scan (decoding included) runs on OCR_QUEUE_WORKERS background
+# threads, so Flask threads only read the upload and poll. Submissions beyond
+# OCR_QUEUE_SIZE waiting jobs are refused with 429; finished jobs are kept
+# OCR_JOB_TTL seconds for polling
+OCR_QUEUE_SIZE = int(os.environ.get('OCR_QUEUE_SIZE', 16))
+OCR_QUEUE_WORKERS = int(os.environ.get('OCR_QUEUE_WORKERS', 2))
+OCR_JOB_TTL = int(os.environ.get('OCR_JOB_TTL', 600))
+OCR_MAX_POLL_WAIT = 30  # Longest wait (?wait=) on a submission or a poll
+ocr_queue = queue.Queue(maxsize=OCR_QUEUE_SIZE)
+ocr_jobs = {}
+ocr_jobs_lock = threading.Lock()
+ocr_queue_workers = []
+ocr_queue_stats = {'submitted': 0, 'rejected': 0, 'completed': 0, 'avg_scan_seconds': 5.0}
+
+# Result cache: uploads whose dHash (HASH_SIZE x HASH_SIZE bits) is within
+# OCR_CACHE_MAX_DISTANCE bits of an earlier successful scan reuse its result.
+# Re-encoded or resized copies of a photo differ by 0-2 bits; keep the
+# threshold tight, a wrong cached medicine is worse than a rescan
+HASH_SIZE = 24
+OCR_CACHE_SIZE = int(os.environ.get('OCR_CACHE_SIZE', 512))  # 0 disables the cache
+OCR_CACHE_MAX_DISTANCE = int(os.environ.get('OCR_CACHE_MAX_DISTANCE', 4))
+
+# Medicine catalog matched against OCR text (built by ai-models/preprocessing)
+MEDICINE_INDEX_PATH = os.environ.get('OCR_MEDICINE_INDEX', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'ai-models', 'data', 'processed', 'medicine_search_index.json'
+))
+
+# Common Indian medicine brands (always recognised, even without the catalog)
+INDIAN_MEDICINES = [
+    'Crocin', 'Dolo', 'Paracetamol', 'Combiflam', 'Vicks', 'Disprin',
+    'Ibuprofen', 'Aspirin', 'Cetrizine', 'Sinarest', 'Allegra', 'Omnacortil',
+    'Azithromycin', 'Amoxicillin', 'Augmentin', 'Ciprofloxacin', 'Metformin',
+    'Amlodipine', 'Atorvastatin', 'Pantoprazole', 'Omeprazole', 'Ranitidine',
+    'NoCough', 'Benadryl', 'Chericof', 'Ascoril', 'Alex', 'Phensedyl',
+    'Glycodin', 'Tossex', 'Corex', 'DX', 'Coldact', 'Grilinctus',
+    'Uromacron', 'Norfloxacin', 'Ofloxacin', 'Levofloxacin', 'Moxifloxacin'
+]
+
+# Dosage-form words dropped from catalog names ("Dolo 650 Tablet" -> "Dolo 650")
+FORM_WORDS = {
+    'tablet', 'tablets', 'capsule', 'capsules', 'syrup', 'suspension', 'injection',
+    'drops', 'drop', 'cream', 'gel', 'ointment', 'solution', 'lotion', 'powder',
+    'spray', 'inhaler', 'rotacap', 'respules', 'sachet', 'granules', 'soap', 'shampoo'
+}
+
+# Characters Tesseract confuses, folded to one form in catalog names and OCR text alike
+OCR_CONFUSIONS = str.maketrans({'0': 'o', '1': 'l', 'i': 'l', '|': 'l', '!': 'l'})
+
+# Match kinds, best first: full catalog name, built-in brand name, generic name,
+# first word of a multi-word catalog brand (only for words of CATALOG_WORD_MIN_LENGTH+
+# letters naming one product family, i.e. every brand starting with it has
+# the same generic; "Cold", "Vitamin" or a company name never qualify)
+BRAND, BRAND_WORD, GENERIC, CATALOG_WORD = 0, 1, 2, 3
+CATALOG_WORD_MIN_LENGTH = 5
+
 # Try to import and configure Tesseract
 TESSERACT_AVAILABLE = False
 try:
@@ -52,6 +175,13 @@ except ImportError:
 
 @app.route('/ocr-scan', methods=['POST'])
 def ocr_scan():
+    """
+    Queue a medicine photo for scanning. Returns 202 with a job id at once,
+    to be polled at /ocr-scan/<job_id>; ?wait=N (at most OCR_MAX_POLL_WAIT
+    seconds) holds the request that long for the result first. Decoding and
+    OCR both run on the job queue. When the queue is full the upload is
+    refused with 429 and Retry-After.
+    """
     try:
         # Check if Tesseract is available
         if not TESSERACT_AVAILABLE:
@@ -61,46 +191,97 @@ def ocr_scan():
                 'extracted_text': ''
             }), 503
         
-        data = request.json
+        # Shed load before reading the body
+        if ocr_queue.full():
+            return queue_full()
         
-        if 'image' not in data:
+        upload = open_upload()
+        if upload is None:
             return jsonify({'error': 'No image provided'}), 400
         
-        # Decode base64 image
-        image_data = base64.b64decode(data['image'])
-        image = Image.open(io.BytesIO(image_data))
-        
-        # Try multiple orientations for better results
-        best_text = ""
-        best_medicine = None
+        job = submit_ocr_job(upload)
+        if job is None:
+            upload.close()
+            return queue_full()
         
-        for angle in [0, -5, 5, -10, 10]:  # Try slight rotations
-            rotated = image.rotate(angle, expand=True, fillcolor='white') if angle != 0 else image
-            processed_image = preprocess_image(rotated)
-            extracted_text = perform_enhanced_ocr(processed_image)
-            
-            # Try to find medicine name
-            medicine_name = extract_medicine_name(extracted_text)
-            
-            if medicine_name:
-                best_medicine = medicine_name
-                best_text = extracted_text
-                print(f"✅ Found medicine at {angle}° rotation: {medicine_name}")
-                break
-            
-            # Keep the longest text
-            if len(extracted_text.strip()) > len(best_text.strip()):
-                best_text = extracted_text
+        wait_for_job(job)
+        if job['status'] == 'done':
+            # Answered within the wait: nobody will poll this job
+            with ocr_jobs_lock:
+                ocr_jobs.pop(job['id'], None)
+        return job_response(job)
+    
+    except RequestEntityTooLarge:
+        return upload_too_large()
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/ocr-scan/<job_id>', methods=['GET'])
+def ocr_job_status(job_id):
+    """Status or result of a queued scan; ?wait=N long-polls up to N seconds"""
+    with ocr_jobs_lock:
+        job = ocr_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'error': 'Job not found',
+            'message': 'Unknown or expired OCR job. Please upload the image again.'
+        }), 404
+    
+    wait_for_job(job)
+    return job_response(job)
+
+
+def wait_for_job(job):
+    """Block for the request's ?wait= seconds (capped at OCR_MAX_POLL_WAIT) or until the job is done"""
+    wait = request.args.get('wait', default=0, type=float)
+    if wait > 0:
+        job['done'].wait(min(wait, OCR_MAX_POLL_WAIT))
+
+
+def scan_upload(upload):
+    """
+    Queue worker side of a scan: decode the upload, answer near-duplicates of
+    earlier scans from the result cache, OCR the rest -> (payload, status)
+    """
+    try:
+        with upload:
+            image = load_upload_image(upload)
+            image.load()
+    except UnidentifiedImageError:
+        return {
+            'error': 'Invalid image',
+            'message': 'Could not read the upload as an image. Please upload a JPEG or PNG photo.'
+        }, 400
+    
+    # Near-duplicate of an earlier scan: reuse its result
+    image_hash = scan_cache.image_hash(image)
+    cached = scan_cache.get(image_hash)
+    if cached is not None:
+        print(f"♻️  Cached scan result: {cached['medicine_name']}")
+        return cached, 200
+    
+    payload, status = run_ocr_scan(image)
+    if status == 200:
+        scan_cache.put(image_hash, payload)
+    return payload, status
+
+
+def run_ocr_scan(image):
+    """OCR one decoded image -> (response payload, HTTP status)"""
+    try:
+        # Deskew and OCR (falls back to trying several orientations)
+        best_text, best_medicine = scan_image(image)
         
         extracted_text = best_text
         print(f"📝 Raw OCR output: {extracted_text[:200]}")  # Debug print
         
         # Check if any text was extracted
         if not extracted_text.strip():
-            return jsonify({
+            return {
                 'error': 'No text found in image',
                 'message': 'Could not extract any text. Please take a clearer photo with visible text.'
-            }), 400
+            }, 400
         
         # Extract medicine name using pattern matching
         if not best_medicine:
@@ -113,23 +294,626 @@ def ocr_scan():
             print(f"DEBUG: Extracted text = '{extracted_text}'")
             print(f"DEBUG: Extracted text length = {len(extracted_text)}")
             print(f"DEBUG: Extracted text stripped = '{extracted_text.strip()}'")
-            return jsonify({
+            return {
                 'error': 'Medicine not found',
                 'message': 'Could not identify medicine name. Please upload a clear photo of medicine packaging.',
                 'extracted_text': extracted_text.strip()
-            }), 400
+            }, 400
         
         # Calculate confidence (simple heuristic)
         confidence = calculate_confidence(extracted_text, medicine_name)
         
-        return jsonify({
+        return {
             'medicine_name': medicine_name,
             'extracted_text': extracted_text.strip(),
             'confidence': confidence
-        })
+        }, 200
     
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
+
+
+def start_ocr_queue():
+    """Start the queue worker threads (on first submission)"""
+    with ocr_jobs_lock:
+        if ocr_queue_workers:
+            return
+        for i in range(max(1, OCR_QUEUE_WORKERS)):
+            worker = threading.Thread(target=ocr_queue_worker, name=f'ocr-queue-{i}', daemon=True)
+            worker.start()
+            ocr_queue_workers.append(worker)
+
+
+def ocr_queue_worker():
+    """Run queued scans one at a time, forever (a failed scan ends its job with a 500)"""
+    while True:
+        job = ocr_queue.get()
+        started = time.time()
+        try:
+            job['status'] = 'running'
+            job['result'] = scan_upload(job.pop('upload'))
+        except Exception as e:
+            print(f"❌ OCR job {job['id']} failed: {e}")
+            job['result'] = ({'error': str(e)}, 500)
+        finally:
+            elapsed = time.time() - started
+            with ocr_jobs_lock:
+                ocr_queue_stats['completed'] += 1
+                # Moving average of scan time, for Retry-After hints
+                ocr_queue_stats['avg_scan_seconds'] = 0.8 * ocr_queue_stats['avg_scan_seconds'] + 0.2 * elapsed
+                job['status'] = 'done'
+                job['finished'] = time.time()
+            job['done'].set()
+            ocr_queue.task_done()
+
+
+def submit_ocr_job(upload):
+    """Queue an uploaded image file for scanning -> job dict, or None if the queue is full"""
+    start_ocr_queue()
+    prune_ocr_jobs()
+    job = {
+        'id': uuid.uuid4().hex,
+        'status': 'queued',
+        'upload': upload,
+        'result': None,
+        'submitted': time.time(),
+        'finished': None,
+        'done': threading.Event()
+    }
+    with ocr_jobs_lock:
+        try:
+            ocr_queue.put_nowait(job)
+        except queue.Full:
+            return None
+        ocr_jobs[job['id']] = job
+        ocr_queue_stats['submitted'] += 1
+    return job
+
+
+def prune_ocr_jobs():
+    """Forget finished jobs nobody polled within OCR_JOB_TTL"""
+    cutoff = time.time() - OCR_JOB_TTL
+    with ocr_jobs_lock:
+        expired = [job_id for job_id, job in ocr_jobs.items() if job['finished'] and job['finished'] < cutoff]
+        for job_id in expired:
+            del ocr_jobs[job_id]
+
+
+def retry_after_seconds():
+    """Rough wait until the queue has room: queued scans x average scan time / workers"""
+    backlog = ocr_queue.qsize() + max(1, OCR_QUEUE_WORKERS)
+    return max(1, math.ceil(backlog * ocr_queue_stats['avg_scan_seconds'] / max(1, OCR_QUEUE_WORKERS)))
+
+
+def queue_full():
+    """429 response when the OCR queue has no room"""
+    with ocr_jobs_lock:
+        ocr_queue_stats['rejected'] += 1
+    retry_after = retry_after_seconds()
+    response = jsonify({
+        'error': 'OCR server busy',
+        'message': f'Too many scans in progress. Please try again in {retry_after} seconds.',
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+
+def job_response(job):
+    """202 with a poll URL while a job is pending, its scan result once done"""
+    if job['status'] == 'done':
+        payload, status = job['result']
+        return jsonify({'job_id': job['id'], 'status': 'done', **payload}), status
+    
+    poll_url = f"/ocr-scan/{job['id']}"
+    response = jsonify({
+        'job_id': job['id'],
+        'status': job['status'],
+        'queue_depth': ocr_queue.qsize(),
+        'poll_url': poll_url
+    })
+    response.headers['Location'] = poll_url
+    response.headers['Retry-After'] = '1'
+    return response, 202
+
+
+def upload_too_large():
+    """413 response for uploads over MAX_UPLOAD_BYTES"""
+    return jsonify({
+        'error': 'Image too large',
+        'message': f'Please upload an image smaller than {MAX_UPLOAD_BYTES / (1024 * 1024):g} MB.'
+    }), 413
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def handle_request_too_large(e):
+    return upload_too_large()
+
+
+def read_body(limit):
+    """
+    The request body streamed into a spooled temporary file with a running
+    byte count: refused (RequestEntityTooLarge) as soon as it passes limit,
+    whether or not the client sent a Content-Length. Returns (file, size)
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+    size = 0
+    while True:
+        chunk = request.stream.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > limit:
+            body.close()
+            raise RequestEntityTooLarge()
+        body.write(chunk)
+    body.seek(0)
+    return body, size
+
+
+def open_upload():
+    """
+    The uploaded image as a binary file object, or None if there is none.
+    Accepts a multipart 'image' field or a raw image/octet-stream body as well
+    as the original JSON {"image": "<base64>"}. Binary bodies are read with a
+    running limit (MAX_UPLOAD_BYTES, plus multipart framing), so chunked
+    uploads are cut off as early as ones with a Content-Length; base64 JSON is
+    capped at MAX_JSON_BODY_BYTES and its decoded image at MAX_UPLOAD_BYTES.
+    The returned file does not depend on the request and may outlive it.
+    """
+    multipart = request.mimetype == 'multipart/form-data'
+    binary = request.mimetype == 'application/octet-stream' or request.mimetype.startswith('image/')
+    limit = MAX_MULTIPART_BODY_BYTES if multipart else MAX_UPLOAD_BYTES if binary else MAX_JSON_BODY_BYTES
+    if request.content_length is not None and request.content_length > limit:
+        raise RequestEntityTooLarge()
+    
+    # Multipart form upload, parsed from the size-checked body
+    if multipart:
+        body, size = read_body(limit)
+        _, _, files = FormDataParser().parse(body, request.mimetype, size, request.mimetype_params)
+        upload = files.get('image')
+        if upload is None:
+            return None
+        upload.stream.seek(0, os.SEEK_END)
+        if upload.stream.tell() > MAX_UPLOAD_BYTES:
+            raise RequestEntityTooLarge()
+        upload.stream.seek(0)
+        return upload.stream
+    
+    # Raw binary body
+    if binary:
+        body, size = read_body(limit)
+        return body if size else None
+    
+    # JSON with a base64 encoded image
+    data = request.get_json(silent=True) or {}
+    if 'image' not in data:
+        return None
+    image_data = base64.b64decode(data['image'])
+    if len(image_data) > MAX_UPLOAD_BYTES:
+        raise RequestEntityTooLarge()
+    return io.BytesIO(image_data)
+
+
+def load_upload_image(upload):
+    """
+    Decode an upload at the resolution OCR needs: JPEGs are decoded directly
+    at a reduced scale (draft mode), EXIF orientation is applied, and large
+    photos are downsampled so typical text is about TARGET_TEXT_HEIGHT pixels.
+    upload is a binary file object (see open_upload)
+    """
+    image = Image.open(upload)
+    
+    # JPEG draft mode: the decoder itself scales by 1/2, 1/4 or 1/8
+    width, height = image.size
+    scale = MAX_IMAGE_SIDE / max(width, height)
+    if image.format == 'JPEG' and scale < 1:
+        image.draft(image.mode, (int(width * scale), int(height * scale)))
+    
+    # Phone photos are often stored sideways with an EXIF rotation flag
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    # Cap the resolution (draft mode only gets within 2x of it)
+    width, height = image.size
+    scale = MAX_IMAGE_SIDE / max(width, height)
+    if scale < 1:
+        image = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.LANCZOS)
+    
+    # Downsample until the text is no bigger than Tesseract needs
+    if OPENCV_AVAILABLE:
+        text_height = estimate_text_height(image)
+        if text_height > TARGET_TEXT_HEIGHT * 1.5:
+            scale = TARGET_TEXT_HEIGHT / text_height
+            width, height = image.size
+            new_size = (int(width * scale), int(height * scale))
+            if min(new_size) >= 300:
+                image = image.resize(new_size, Image.LANCZOS)
+    
+    print(f"🖼️  Decoded upload at {image.size[0]}x{image.size[1]}")
+    return image
+
+
+class ScanResultCache:
+    """
+    Bounded cache of successful scan results keyed on a perceptual hash
+    (dHash) of the decoded upload. A lookup compares the hash with every
+    stored one at once (XOR + popcount over a NumPy matrix) and returns the
+    nearest result within max_distance bits; the least recently used entry is
+    evicted when full. Disabled (always misses) without NumPy or with
+    capacity 0.
+    """
+    
+    def __init__(self, capacity=OCR_CACHE_SIZE, max_distance=OCR_CACHE_MAX_DISTANCE):
+        self.enabled = NUMPY_AVAILABLE and capacity > 0
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.lock = threading.Lock()
+        self.results = [None] * capacity   # slot -> response payload
+        if self.enabled:
+            self.hashes = np.zeros((capacity, HASH_SIZE * HASH_SIZE // 8), dtype=np.uint8)
+            self.used = np.zeros(capacity, dtype=bool)
+            self.last_used = np.zeros(capacity, dtype=np.int64)
+        self.clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def image_hash(self, image):
+        """dHash: sign of horizontal gradients of a tiny grayscale copy, packed into bytes"""
+        if not self.enabled:
+            return None
+        small = ImageOps.autocontrast(image.convert('L').resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR))
+        pixels = np.asarray(small, dtype=np.int16)
+        return np.packbits(pixels[:, 1:] > pixels[:, :-1])
+    
+    def get(self, image_hash):
+        """Cached payload of the nearest stored hash within max_distance, or None"""
+        if image_hash is None:
+            return None
+        with self.lock:
+            self.clock += 1
+            slots = np.flatnonzero(self.used)
+            if len(slots):
+                distances = np.unpackbits(self.hashes[slots] ^ image_hash, axis=1).sum(axis=1)
+                nearest = int(np.argmin(distances))
+                if distances[nearest] <= self.max_distance:
+                    slot = slots[nearest]
+                    self.last_used[slot] = self.clock
+                    self.hits += 1
+                    return self.results[slot]
+            self.misses += 1
+            return None
+    
+    def put(self, image_hash, payload):
+        """Store a successful scan result, evicting the least recently used entry if full"""
+        if image_hash is None:
+            return
+        with self.lock:
+            self.clock += 1
+            free = np.flatnonzero(~self.used)
+            if len(free):
+                slot = free[0]
+            else:
+                slot = int(np.argmin(self.last_used))
+                self.evictions += 1
+            self.hashes[slot] = image_hash
+            self.used[slot] = True
+            self.last_used[slot] = self.clock
+            self.results[slot] = payload
+    
+    def stats(self):
+        """Counters for monitoring (hit_rate is over all lookups so far)"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': int(self.used.sum()) if self.enabled else 0,
+                'capacity': self.capacity,
+                'max_distance': self.max_distance,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+
+scan_cache = ScanResultCache()
+
+
+def find_characters(gray, min_height=8):
+    """
+    Connected components of a grayscale array that look like characters.
+    Returns (labels, is_character per label, (x, y, width, height) character boxes)
+    """
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+    
+    # Skip specks, frames/outlines (little ink in their box) and blobs too big
+    # or too flat to be characters
+    widths = stats[:, cv2.CC_STAT_WIDTH]
+    heights = stats[:, cv2.CC_STAT_HEIGHT]
+    is_character = (
+        (heights >= min_height) & (heights <= gray.shape[0] // 3) &
+        (widths <= heights * 3) & (heights <= widths * 8) &
+        (stats[:, cv2.CC_STAT_AREA] >= widths * heights * 0.1)
+    )
+    is_character[0] = False  # background
+    return labels, is_character, stats[is_character, :4]
+
+
+def character_boxes(image):
+    """(x, y, width, height) rows of character-sized dark blobs"""
+    _, _, boxes = find_characters(np.array(image.convert('L')))
+    return boxes
+
+
+def estimate_text_height(image):
+    """Median height (pixels) of character-sized dark blobs, 0 if none are found"""
+    boxes = character_boxes(image)
+    if not len(boxes):
+        return 0
+    return float(np.median(boxes[:, 3]))
+
+
+def detect_text_regions(image, limit=MAX_TEXT_REGIONS):
+    """
+    Candidate text blocks of a (deskewed) image, most prominent first, as
+    (box, psm). Characters are found as connected components and each is
+    widened by ~0.6x its own height, so letters of a word/line merge at any
+    text size while lines of different sizes stay apart. Blocks are ranked by
+    text height (brand names are the largest text), with a small bonus for
+    sitting higher on the pack.
+    """
+    boxes = character_boxes(image)
+    width, height = image.size
+    mask = np.zeros((height, width), dtype=np.uint8)
+    for x, y, w, h in boxes:
+        pad = int(h * 0.6)
+        cv2.rectangle(mask, (max(0, x - pad), y), (min(width - 1, x + w + pad), y + h - 1), 255, -1)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < h * 1.5:
+            continue  # lone characters and symbols
+        score = h * (1.0 + 0.25 * (1 - (y + h / 2) / height))
+        # Short blocks are usually a single word (brand), longer ones a line of text
+        psm = 8 if w < h * 4 else 7
+        pad = max(4, h // 4)
+        box = (max(0, x - pad), max(0, y - pad), min(width, x + w + pad), min(height, y + h + pad))
+        regions.append((score, box, psm))
+    
+    regions.sort(key=lambda region: -region[0])
+    return [(box, psm) for _, box, psm in regions[:limit]]
+
+
+def scan_text_regions(image):
+    """
+    OCR only the most prominent text blocks of a deskewed image, each with the
+    PSM that suits it. Returns (text, medicine_name); text lists the blocks in
+    rank order
+    """
+    regions = detect_text_regions(image)
+    if not regions:
+        return "", None
+    print(f"🔲 OCR on {len(regions)} text regions: {[box for box, _ in regions]}")
+    
+    crops = [(image.crop(box), psm) for box, psm in regions]
+    if OCR_WORKERS > 1:
+        pool = get_ocr_pool()
+        try:
+            texts = [future.result() for future in [pool.submit(run_tesseract, crop, psm) for crop, psm in crops]]
+        except BrokenProcessPool:
+            print("⚠️  OCR process pool crashed, reading text regions serially")
+            discard_ocr_pool(pool)
+            texts = [run_tesseract(crop, psm) for crop, psm in crops]
+    else:
+        texts = [run_tesseract(crop, psm) for crop, psm in crops]
+    
+    text = '\n'.join(t.strip() for t in texts if t.strip())
+    return text, extract_medicine_name(text)
+
+
+def scan_image(image):
+    """
+    Find the medicine name in an upload. With OpenCV the text skew is estimated
+    once; the top text regions of the deskewed image are read first, then the
+    whole deskewed frame, and that is all. The blind rotation sweep only runs
+    without OpenCV, where there is no skew estimate to go on.
+    Returns (best_text, best_medicine)
+    """
+    scan = scan_rotations_parallel if OCR_WORKERS > 1 else scan_rotations
+    
+    # Grayscale, resize, denoise and binarize once; every variant is a rotation of this
+    processed_image = preprocess_image(image)
+    
+    if not OPENCV_AVAILABLE:
+        return scan(processed_image, ROTATION_ANGLES)
+    
+    skew = estimate_skew(processed_image)
+    print(f"📐 Estimated skew: {skew:.1f}°")
+    
+    # The largest text blocks alone usually name the medicine
+    region_text, medicine_name = scan_text_regions(rotate_image(processed_image, skew))
+    if medicine_name:
+        print(f"✅ Found medicine in text regions: {medicine_name}")
+        return region_text, medicine_name
+    
+    # Then one pass over the whole deskewed frame
+    deskewed_text, medicine_name = scan(processed_image, [skew])
+    if not medicine_name and len(region_text.strip()) > len(deskewed_text.strip()):
+        deskewed_text = region_text
+    return deskewed_text, medicine_name
+
+
+def estimate_skew(image):
+    """
+    Estimate text skew in degrees (the angle to pass to image.rotate to
+    straighten it) from the orientation of text-line blobs: characters are
+    merged into lines by a horizontal dilation, and the long side of each
+    line's minimum-area rectangle gives its angle (length-weighted median)
+    """
+    gray = np.array(image.convert('L'))
+    
+    # Skew does not depend on scale: measure on a small copy
+    height, width = gray.shape
+    scale = SKEW_ANALYSIS_SIZE / max(height, width)
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    
+    # Keep only character blobs (no frames, boxes or photo edges), then merge them into line blobs
+    labels, is_character, _ = find_characters(gray, min_height=4)
+    binary = is_character[labels].astype(np.uint8) * 255
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3))
+    lines = cv2.dilate(binary, kernel, iterations=1)
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    
+    angles = []
+    weights = []
+    for contour in contours:
+        corners = cv2.boxPoints(cv2.minAreaRect(contour))
+        edges = [corners[(i + 1) % 4] - corners[i] for i in range(2)]
+        dx, dy = max(edges, key=lambda edge: edge[0] ** 2 + edge[1] ** 2)
+        long_side = float(np.hypot(dx, dy))
+        short_side = float(min(np.hypot(*edge) for edge in edges))
+        
+        # Only elongated blobs of some size look like text lines
+        if long_side < 20 or long_side < 2 * short_side:
+            continue
+        
+        angle = float(np.degrees(np.arctan2(dy, dx)))
+        if angle > 90:
+            angle -= 180
+        elif angle <= -90:
+            angle += 180
+        if abs(angle) <= MAX_SKEW:
+            angles.append(angle)
+            weights.append(long_side)
+    
+    if not angles:
+        return 0
+    
+    # Length-weighted median (long lines are the most reliable)
+    order = np.argsort(angles)
+    cumulative = np.cumsum(np.array(weights)[order])
+    skew = angles[order[np.searchsorted(cumulative, cumulative[-1] / 2)]]
+    return round(skew, 1) if abs(skew) >= 0.5 else 0
+
+
+def rotate_image(image, angle):
+    """Rotate a preprocessed (grayscale) image, filling the new corners with white"""
+    if angle == 0:
+        return image
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+
+
+def scan_rotations(image, angles=ROTATION_ANGLES):
+    """
+    OCR each rotation of a preprocessed image in turn until a medicine name
+    is found. Returns (best_text, best_medicine)
+    """
+    best_text = ""
+    
+    for angle in angles:
+        extracted_text = perform_enhanced_ocr(rotate_image(image, angle))
+        
+        # Try to find medicine name
+        medicine_name = extract_medicine_name(extracted_text)
+        
+        if medicine_name:
+            print(f"✅ Found medicine at {angle}° rotation: {medicine_name}")
+            return extracted_text, medicine_name
+        
+        # Keep the longest text
+        if len(extracted_text.strip()) > len(best_text.strip()):
+            best_text = extracted_text
+    
+    return best_text, None
+
+
+def get_ocr_pool():
+    """Process pool for Tesseract runs (created on first use)"""
+    global ocr_pool
+    with ocr_pool_lock:
+        if ocr_pool is None:
+            ocr_pool = ProcessPoolExecutor(max_workers=OCR_WORKERS,
+                                           mp_context=multiprocessing.get_context(OCR_POOL_START_METHOD))
+        return ocr_pool
+
+
+def discard_ocr_pool(pool):
+    """Shut down a broken OCR pool; the next get_ocr_pool() starts a fresh one"""
+    global ocr_pool
+    with ocr_pool_lock:
+        if ocr_pool is pool:
+            ocr_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def scan_rotations_parallel(image, angles=ROTATION_ANGLES):
+    """
+    Same search as scan_rotations (on a preprocessed image), with the rotation
+    x PSM Tesseract runs spread over the process pool. Variants are queued in
+    angle order (0° first) and evaluated in that order, so the answer matches
+    the serial scan; as soon as an angle yields a medicine name the variants
+    still queued are cancelled.
+    """
+    pool = get_ocr_pool()
+    submitted = []  # (angle, futures) in priority order
+    state = {'evaluated': 0, 'best_text': "", 'best_medicine': None}
+    
+    def evaluate(wait):
+        """Evaluate finished angles in order; True once a medicine name is found"""
+        while state['evaluated'] < len(submitted):
+            angle, futures = submitted[state['evaluated']]
+            if not wait and not all(future.done() for future in futures):
+                return False
+            results = [future.result() for future in futures]
+            if OCR_SINGLE_PASS:
+                extracted_text = combine_ocr_texts(results[0], merge_words=False)
+            else:
+                extracted_text = combine_ocr_texts(results)
+            state['evaluated'] += 1
+            
+            medicine_name = extract_medicine_name(extracted_text)
+            if medicine_name:
+                print(f"✅ Found medicine at {angle}° rotation: {medicine_name}")
+                state['best_text'], state['best_medicine'] = extracted_text, medicine_name
+                return True
+            
+            # Keep the longest text
+            if len(extracted_text.strip()) > len(state['best_text'].strip()):
+                state['best_text'] = extracted_text
+        return False
+    
+    try:
+        for angle in angles:
+            rotated = rotate_image(image, angle)
+            if OCR_SINGLE_PASS:
+                futures = [pool.submit(single_pass_texts, rotated)]
+            else:
+                futures = [pool.submit(run_tesseract, rotated, psm) for psm in PSM_MODES]
+            submitted.append((angle, futures))
+            
+            # Check earlier angles while the next rotation is being prepared
+            if evaluate(wait=False):
+                break
+        else:
+            evaluate(wait=True)
+    except BrokenProcessPool:
+        print("⚠️  OCR process pool crashed, scanning serially")
+        discard_ocr_pool(pool)
+        return scan_rotations(image, angles)
+    finally:
+        # Early exit: drop every variant that has not started yet
+        for _, futures in submitted:
+            for future in futures:
+                future.cancel()
+    
+    return state['best_text'], state['best_medicine']
 
 
 def preprocess_image(image):
@@ -196,28 +980,103 @@ def preprocess_image(image):
         return image
 
 
-def perform_enhanced_ocr(image):
+def run_tesseract(image, psm):
+    """OCR one image with one page segmentation mode (also the process pool entry point)"""
+    return pytesseract.image_to_string(image, config=f'--psm {psm} --oem 3')
+
+
+def run_tesseract_words(image, psm=DATA_PSM):
     """
-    Perform OCR with multiple configurations and combine results
+    OCR one image with image_to_data -> list of recognised words as dicts
+    (text, conf, left, top, width, height, block, par, line)
+    """
+    data = pytesseract.image_to_data(image, config=f'--psm {psm} --oem 3', output_type=pytesseract.Output.DICT)
+    words = []
+    for i, text in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if conf < 0 or not str(text).strip():
+            continue
+        words.append({
+            'text': str(text).strip(),
+            'conf': conf,
+            'left': data['left'][i],
+            'top': data['top'][i],
+            'width': data['width'][i],
+            'height': data['height'][i],
+            'block': data['block_num'][i],
+            'par': data['par_num'][i],
+            'line': data['line_num'][i]
+        })
+    return words
+
+
+def ocr_views(words):
     """
-    texts = []
+    Rebuild the texts the separate PSM runs used to produce from one set of
+    word boxes: uniform block (words regrouped into rows by position), sparse
+    text (Tesseract's own lines), confident words only, and the tallest
+    confident word (usually the brand name)
+    """
+    if not words:
+        return [""]
+    
+    # Uniform block: rows of words whose vertical centres are close, read left to right
+    row_height = sorted(word['height'] for word in words)[len(words) // 2]
+    rows = []
+    for word in sorted(words, key=lambda w: w['top'] + w['height'] / 2):
+        center = word['top'] + word['height'] / 2
+        if rows and center - rows[-1][0] <= row_height / 2:
+            rows[-1][1].append(word)
+        else:
+            rows.append((center, [word]))
+    block = '\n'.join(' '.join(w['text'] for w in sorted(row, key=lambda w: w['left'])) for _, row in rows)
     
-    # Configuration 1: Assume single uniform block of text
-    text1 = pytesseract.image_to_string(image, config='--psm 6 --oem 3')
-    texts.append(text1)
+    # Sparse text: Tesseract's lines, in the order it found them
+    lines = {}
+    for word in words:
+        lines.setdefault((word['block'], word['par'], word['line']), []).append(word['text'])
+    sparse = '\n'.join(' '.join(line) for line in lines.values())
     
-    # Configuration 2: Treat as sparse text (good for bottles/boxes)
-    text2 = pytesseract.image_to_string(image, config='--psm 11 --oem 3')
-    texts.append(text2)
+    confident = [word for word in words if word['conf'] >= OCR_MIN_CONFIDENCE]
+    confident_text = ' '.join(word['text'] for word in confident)
+    tallest = max(confident, key=lambda w: w['height'])['text'] if confident else ""
     
-    # Configuration 3: Single text line
-    text3 = pytesseract.image_to_string(image, config='--psm 7 --oem 3')
-    texts.append(text3)
+    return [block, sparse, confident_text, tallest]
+
+
+def single_pass_texts(image):
+    """
+    OCR views of an image from one image_to_data run, plus a uniform-block
+    image_to_string run when the words are mostly low-confidence (also a
+    process pool entry point)
+    """
+    words = run_tesseract_words(image)
+    texts = ocr_views(words)
     
-    # Configuration 4: Single word (for clear brand names)
-    text4 = pytesseract.image_to_string(image, config='--psm 8 --oem 3')
-    texts.append(text4)
+    confidence = sum(word['conf'] for word in words) / len(words) if words else 0
+    if confidence < OCR_MIN_CONFIDENCE:
+        texts.append(run_tesseract(image, SECOND_PASS_PSM))
+    return texts
+
+
+def perform_enhanced_ocr(image):
+    """
+    Perform OCR with multiple configurations and combine results
+    """
+    if OCR_SINGLE_PASS:
+        return combine_ocr_texts(single_pass_texts(image), merge_words=False)
     
+    # Uniform block, sparse text (bottles/boxes), single line, single word (brand names)
+    texts = [run_tesseract(image, psm) for psm in PSM_MODES]
+    return combine_ocr_texts(texts)
+
+
+def combine_ocr_texts(texts, merge_words=True):
+    """
+    Combine the texts of the different PSM runs into one OCR result.
+    merge_words=False keeps the longest text as is (single-pass views share
+    the same words, and already include a confident-words view)
+    """
     # Get all extracted texts and combine unique valid words
     all_words = []
     for text in texts:
@@ -229,12 +1088,153 @@ def perform_enhanced_ocr(image):
     
     # If combined is mostly garbage, try to extract readable words
     readable_words = [w for w in all_words if len(w) >= 3 and w.isalpha()]
-    if readable_words and len(combined.strip()) < 50:
+    if merge_words and readable_words and len(combined.strip()) < 50:
         combined = ' '.join(readable_words)
     
     return combined
 
 
+def fold_ocr_span(text):
+    """
+    Canonical form used for catalog matching: lower-cased, OCR confusions
+    folded (rn -> m, 0 -> o, 1/I/l/| -> l), every run of other characters
+    turned into one space, padded with spaces so words match whole.
+    Returns (folded text, origin) where origin[k] is the index in text of
+    folded character k (plus one entry for the end of the text)
+    """
+    lowered = [(c, i) for i, character in enumerate(text) for c in character.lower()]
+    chars, origin = [' '], [0]
+    k = 0
+    while k < len(lowered):
+        character, position = lowered[k]
+        if character == 'r' and k + 1 < len(lowered) and lowered[k + 1][0] == 'n':
+            character = 'm'
+            k += 1
+        character = character.translate(OCR_CONFUSIONS)
+        if character.isascii() and character.isalnum():
+            chars.append(character)
+            origin.append(position)
+        elif chars[-1] != ' ':
+            chars.append(' ')
+            origin.append(position)
+        k += 1
+    if chars[-1] != ' ' or len(chars) == 1:
+        chars.append(' ')
+        origin.append(len(text))
+    origin.append(len(text))
+    return ''.join(chars), origin
+
+
+def fold_ocr_text(text):
+    """Folded form of text (see fold_ocr_span)"""
+    return fold_ocr_span(text)[0]
+
+
+class MedicineVocabulary:
+    """
+    Medicine names compiled into one Aho-Corasick automaton over folded text
+    (see fold_ocr_span), so every OCR token is checked against thousands of
+    brands in a single left-to-right pass
+    """
+    
+    def __init__(self):
+        self.automaton = AhoCorasick(normalize=fold_ocr_text)
+        self.names = {}        # folded name -> kind, to skip duplicates
+    
+    def __len__(self):
+        return len(self.names)
+    
+    def add(self, name, kind):
+        """Register a display name; it matches wherever its folded form appears as whole words"""
+        pattern = fold_ocr_text(name)
+        if len(pattern.strip()) < 3 or self.names.get(pattern, CATALOG_WORD + 1) <= kind:
+            return
+        self.names[pattern] = kind
+        self.automaton.add(name, (name, kind))
+    
+    def build(self):
+        self.automaton.build()
+        return self
+    
+    def find_all(self, text):
+        """Yield (start, end, name, kind) for every name occurring in text (folded positions)"""
+        for start, end, (name, kind) in self.automaton.find_all(text):
+            yield start, end, name, kind
+    
+    def best_match(self, text):
+        """
+        (name, start, end) of the best name found in text, or None; start/end
+        delimit the matched words in text itself. Best kind first; among full
+        catalog names the longest (most specific), among single words the first
+        """
+        best = min(self.find_all(text), key=lambda m: (m[3], m[0] - m[1] if m[3] == BRAND else 0, m[0]),
+                   default=None)
+        if best is None:
+            return None
+        start, end, name, _ = best
+        # The folded match is padded with one space on each side
+        origin = fold_ocr_span(text)[1]
+        return name, origin[start + 1], origin[end - 1]
+
+
+def catalog_name(name):
+    """Catalog brand name without dosage-form words ("Dolo 650 Tablet" -> "Dolo 650")"""
+    return ' '.join(word for word in name.split() if word.lower() not in FORM_WORDS)
+
+
+def load_medicine_vocabulary(path=MEDICINE_INDEX_PATH):
+    """Automaton over the built-in brands plus every brand and generic in the catalog"""
+    vocabulary = MedicineVocabulary()
+    for name in INDIAN_MEDICINES:
+        vocabulary.add(name, BRAND_WORD)
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Medicine catalog not loaded ({e}). Recognising {len(vocabulary)} built-in brands only.")
+        return vocabulary.build()
+    
+    families = {}   # first word of a multi-word brand -> generics of the brands starting with it
+    spellings = {}  # lower-cased first word -> its spelling in the catalog
+    generic_words = set()
+    for entry in catalog:
+        generic_name = (entry.get('generic_name') or '').lower()
+        brand = catalog_name(entry.get('name') or '')
+        if brand:
+            vocabulary.add(brand, BRAND)
+            words = brand.split()
+            if len(words) > 1:
+                families.setdefault(words[0].lower(), set()).add(generic_name)
+                spellings.setdefault(words[0].lower(), words[0])
+        for generic in re.split(r'\s*\+\s*', generic_name):
+            if generic:
+                vocabulary.add(generic.title(), GENERIC)
+                generic_words.update(generic.split())
+    
+    # Single brand words, ranked below generics
+    for word, generics in families.items():
+        if (len(generics) == 1 and word.isalpha() and len(word) >= CATALOG_WORD_MIN_LENGTH
+                and word not in generic_words):
+            vocabulary.add(spellings[word], CATALOG_WORD)
+    
+    print(f"✅ Medicine catalog loaded: {len(vocabulary)} names from {len(catalog)} entries")
+    return vocabulary.build()
+
+
+def get_medicine_vocabulary():
+    """Medicine automaton (built on first use)"""
+    global medicine_vocabulary
+    with medicine_vocabulary_lock:
+        if medicine_vocabulary is None:
+            medicine_vocabulary = load_medicine_vocabulary()
+        return medicine_vocabulary
+
+
+medicine_vocabulary = None
+medicine_vocabulary_lock = threading.Lock()
+
+
 def extract_medicine_name(text):
     """
     Extract medicine name from OCR text using improved pattern matching
@@ -248,35 +1248,18 @@ def extract_medicine_name(text):
     
     print(f"🔍 Analyzing lines: {lines[:10]}")  # Debug
     
-    # Common Indian medicine brands and patterns
-    indian_medicines = [
-        'Crocin', 'Dolo', 'Paracetamol', 'Combiflam', 'Vicks', 'Disprin',
-        'Ibuprofen', 'Aspirin', 'Cetrizine', 'Sinarest', 'Allegra', 'Omnacortil',
-        'Azithromycin', 'Amoxicillin', 'Augmentin', 'Ciprofloxacin', 'Metformin',
-        'Amlodipine', 'Atorvastatin', 'Pantoprazole', 'Omeprazole', 'Ranitidine',
-        'NoCough', 'Benadryl', 'Chericof', 'Ascoril', 'Alex', 'Phensedyl',
-        'Glycodin', 'Tossex', 'Corex', 'DX', 'Coldact', 'Grilinctus',
-        'Uromacron', 'Norfloxacin', 'Ofloxacin', 'Levofloxacin', 'Moxifloxacin'
-    ]
-    
-    # Extract all words that are at least 3 characters and mostly alphabetic
-    words = re.findall(r'\b[A-Za-z]{3,}(?:\s*[A-Z]{2})?\b', text)
-    
-    print(f"🔍 Extracted words: {words[:20]}")  # Debug
-    
-    # Pattern 1: Check for known medicines (case insensitive)
-    for word in words:
-        for med in indian_medicines:
-            if med.lower() == word.lower():
-                # Look for dosage nearby in original text
-                dosage_match = re.search(rf'{word}\s*(\d+\s*(?:mg|ml|g))', text, re.IGNORECASE)
-                if dosage_match:
-                    return f"{med} {dosage_match.group(1)}"
-                return med
-            # Partial match (at least 70% similar)
-            if len(word) >= 4 and (word.lower() in med.lower() or med.lower() in word.lower()):
-                if len(word) >= len(med) * 0.7:
-                    return med
+    # Pattern 1: Known medicines, all OCR tokens matched against the catalog in one pass
+    match = get_medicine_vocabulary().best_match(text)
+    if match:
+        medicine_name, start, end = match
+        print(f"🔍 Catalog match: {medicine_name} (read as {text[start:end]!r})")
+        if re.search(r'\d', medicine_name):
+            return medicine_name
+        # Look for dosage right after the matched words in the original text
+        dosage_match = re.match(r'\s*(\d+\s*(?:mg|ml|g))', text[end:], re.IGNORECASE)
+        if dosage_match:
+            return f"{medicine_name} {dosage_match.group(1)}"
+        return medicine_name
     
     # Pattern 2: Look for "DX" suffix (common in cough syrups)
     dx_match = re.search(r'([A-Za-z]+)\s*DX', text, re.IGNORECASE)
@@ -370,11 +1353,19 @@ def calculate_confidence(text, medicine_name):
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'ok', 'message': 'OCR server is running'})
+    with ocr_jobs_lock:
+        queue_stats = dict(ocr_queue_stats, depth=ocr_queue.qsize(), capacity=OCR_QUEUE_SIZE, jobs=len(ocr_jobs))
+    return jsonify({
+        'status': 'ok',
+        'message': 'OCR server is running',
+        'queue': queue_stats,
+        'result_cache': scan_cache.stats()
+    })
 
 
 if __name__ == '__main__':
     print("🚀 MediAI Flask OCR Server starting...")
     print("📷 Ready to scan medicine photos!")
     print("⚡ Running on http://localhost:8000")
+    get_medicine_vocabulary()
     app.run(host='0.0.0.0', port=8000, debug=True)
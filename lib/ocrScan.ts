@@ -0,0 +1,77 @@
+import { NextResponse } from 'next/server';
+
+const FLASK_OCR_URL = 'http://localhost:8000';
+// Total time an API request keeps polling a scan before handing back the job id
+const POLL_BUDGET_MS = 60000;
+// Flask requests return at once (no ?wait=), so no Flask thread is held while
+// a scan runs; polls are spaced by the job's Retry-After hint
+const REQUEST_TIMEOUT_MS = 15000;
+const DEFAULT_POLL_INTERVAL_MS = 1000;
+
+// Poll a Flask OCR job until it finishes or the budget runs out
+export async function followOcrJob(flaskResponse: Response): Promise<Response> {
+  const deadline = Date.now() + POLL_BUDGET_MS;
+  while (flaskResponse.status === 202 && Date.now() < deadline) {
+    const retryAfter = Number(flaskResponse.headers.get('Retry-After'));
+    const job = await flaskResponse.json();
+    await new Promise((resolve) => setTimeout(resolve, retryAfter > 0 ? retryAfter * 1000 : DEFAULT_POLL_INTERVAL_MS));
+    flaskResponse = await fetchOcrJob(job.job_id);
+  }
+  return flaskResponse;
+}
+
+export function submitOcrScan(body: FormData): Promise<Response> {
+  return fetch(`${FLASK_OCR_URL}/ocr-scan`, {
+    method: 'POST',
+    body,
+    signal: AbortSignal.timeout(REQUEST_TIMEOUT_MS)
+  });
+}
+
+export function fetchOcrJob(jobId: string): Promise<Response> {
+  return fetch(`${FLASK_OCR_URL}/ocr-scan/${encodeURIComponent(jobId)}`, {
+    signal: AbortSignal.timeout(REQUEST_TIMEOUT_MS)
+  });
+}
+
+// Map a Flask OCR response to the API response the scanner component expects
+export async function toScanResponse(flaskResponse: Response) {
+  if (flaskResponse.status === 202) {
+    // Still queued or running: the client polls GET /api/ocr-scan/<job_id>
+    const job = await flaskResponse.json();
+    return NextResponse.json({
+      message: 'Scan is taking longer than expected, still processing',
+      job_id: job.job_id,
+      status: job.status,
+      poll_url: `/api/ocr-scan/${job.job_id}`
+    }, { status: 202 });
+  } else if (flaskResponse.ok) {
+    const data = await flaskResponse.json();
+    return NextResponse.json({
+      medicine_name: data.medicine_name,
+      confidence: data.confidence || 0,
+      extracted_text: data.extracted_text || ''
+    });
+  } else if (flaskResponse.status === 429) {
+    // OCR queue full: pass the retry hint on to the client
+    const errorData = await flaskResponse.json();
+    return NextResponse.json({
+      message: errorData.message || 'OCR server busy',
+      retry_after: errorData.retry_after
+    }, {
+      status: 429,
+      headers: { 'Retry-After': flaskResponse.headers.get('Retry-After') || '5' }
+    });
+  } else if (flaskResponse.status === 404) {
+    const errorData = await flaskResponse.json();
+    return NextResponse.json({
+      message: errorData.message || 'Unknown or expired scan'
+    }, { status: 404 });
+  } else {
+    const errorData = await flaskResponse.json();
+    return NextResponse.json({
+      message: errorData.message || errorData.error || 'Could not identify medicine',
+      extracted_text: errorData.extracted_text || ''
+    }, { status: 400 });
+  }
+}